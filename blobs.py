@@ -0,0 +1,167 @@
+"""
+Content-addressed store for preview builds: one copy of each distinct file.
+
+A preview is a snapshot of the built site under .build/previews/<name>/, e.g.
+one per branch. Instead of copying the site each time, every published file
+is stored once in .build/blobs/, named by the sha256 of its content, and the
+preview directory is made of hardlinks to those blobs. Previews that share
+most pages share their blobs, so each costs roughly its changed files.
+
+Each preview's tree, {path: digest}, is kept in .build/previews/<name>.json.
+The trees are the roots for garbage collection: gc() deletes every blob no
+tree refers to. A preview's files are never written to in place (a changed
+file is replaced by a new link), since every preview linking to a blob would
+see the change. They are left writable so that they can be replaced and
+deleted everywhere, including on Windows.
+
+Usage:
+  python build_site.py --preview NAME   # build, then snapshot the site as NAME
+  python blobs.py list
+  python blobs.py rm NAME [NAME...]     # drop previews, then collect garbage
+  python blobs.py gc
+"""
+
+import hashlib, json, os, re, shutil, sys
+from pathlib import Path
+
+from check_links import SKIP_DIRS, SKIP_FILES
+
+ROOT = Path(__file__).parent
+BLOBS = ROOT / ".build" / "blobs"
+PREVIEWS = ROOT / ".build" / "previews"
+
+# What gets published, by suffix; other files in the tree are sources
+SITE_SUFFIXES = {'.html', '.xml', '.js', '.json', '.epub'}
+SOURCE_FILES = SKIP_FILES | {'notes.json'}
+
+
+def site_files(root=ROOT, exclude=()):
+    """Paths of the published files, relative to root, in posix form.
+
+    exclude holds files and directories to leave out, as for
+    check_links.site_pages().
+    """
+    exclude = {Path(path) for path in exclude}
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')
+                       and Path(dirpath, d) not in exclude]
+        rel_dir = Path(dirpath).relative_to(root)
+        files += [(rel_dir / f).as_posix() for f in filenames
+                  if Path(f).suffix in SITE_SUFFIXES and f not in SOURCE_FILES
+                  and Path(dirpath, f) not in exclude]
+    return sorted(files)
+
+
+def blob_path(digest):
+    return BLOBS / digest[:2] / digest[2:]
+
+
+def store(path):
+    """Add a file's content to the store; return (digest, bytes newly stored)."""
+    with open(path, 'rb') as fh:
+        digest = hashlib.file_digest(fh, 'sha256').hexdigest()
+    blob = blob_path(digest)
+    if blob.exists():
+        return digest, 0
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    tmp = blob.with_name(blob.name + '.tmp')
+    shutil.copyfile(path, tmp)
+    os.replace(tmp, blob)
+    return digest, blob.stat().st_size
+
+
+def preview_name(name):
+    """A preview's directory name: branch names may contain slashes."""
+    return re.sub(r'[^\w.-]+', '-', name).strip('.-') or 'preview'
+
+
+def materialize(tree, dest):
+    """Make dest hold exactly the files of tree, each a hardlink to its blob."""
+    for rel, digest in tree.items():
+        target, blob = dest / rel, blob_path(digest)
+        if target.exists() and os.path.samefile(target, blob):
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(blob, tmp)
+        except OSError:  # no hardlinks on this filesystem
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, target)
+
+    for dirpath, dirnames, filenames in os.walk(dest, topdown=False):
+        rel_dir = Path(dirpath).relative_to(dest)
+        for f in filenames:
+            if (rel_dir / f).as_posix() not in tree:
+                os.unlink(Path(dirpath) / f)
+        if dirpath != str(dest) and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def snapshot(name, root=ROOT, exclude=()):
+    """Store the site built in root and materialize it as preview name."""
+    name = preview_name(name)
+    tree, added = {}, 0
+    for rel in site_files(root, exclude):
+        tree[rel], size = store(root / rel)
+        added += size
+
+    PREVIEWS.mkdir(parents=True, exist_ok=True)
+    materialize(tree, PREVIEWS / name)
+    (PREVIEWS / f"{name}.json").write_text(json.dumps(tree, indent=1) + '\n',
+                                           encoding='utf-8')
+    print(f"  preview {name}: {len(tree)} files, {added / 1000:.1f} KB new "
+          f"-> {(PREVIEWS / name).relative_to(ROOT).as_posix()}/")
+    gc()
+    return tree
+
+
+def trees():
+    """{preview name: tree} of every preview."""
+    return {path.stem: json.loads(path.read_text(encoding='utf-8'))
+            for path in sorted(PREVIEWS.glob('*.json'))}
+
+
+def gc():
+    """Delete the blobs no preview refers to; return how many."""
+    reachable = {digest for tree in trees().values() for digest in tree.values()}
+    removed = freed = 0
+    for blob in BLOBS.glob('*/*'):
+        if blob.parent.name + blob.name not in reachable:
+            freed += blob.stat().st_size
+            blob.unlink()
+            removed += 1
+    if removed:
+        print(f"  gc: removed {removed} unreachable blobs ({freed / 1000:.1f} KB)")
+    return removed
+
+
+def remove(name):
+    """Delete a preview; its tree goes last, so a failure leaves it reachable."""
+    name = preview_name(name)
+    if (PREVIEWS / name).exists():
+        shutil.rmtree(PREVIEWS / name)
+    (PREVIEWS / f"{name}.json").unlink(missing_ok=True)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if args[:1] == ['list']:
+        for name, tree in trees().items():
+            print(f"  {name}: {len(tree)} files")
+        blobs = list(BLOBS.glob('*/*'))
+        print(f"  {len(blobs)} blobs, {sum(b.stat().st_size for b in blobs) / 1000:.1f} KB")
+    elif args[:1] == ['rm'] and len(args) > 1:
+        for name in args[1:]:
+            remove(name)
+        gc()
+    elif args == ['gc']:
+        gc()
+    else:
+        sys.exit(__doc__.split('Usage:')[1])
+
+
+if __name__ == '__main__':
+    main()
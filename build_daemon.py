@@ -0,0 +1,181 @@
+"""
+Keep build_site.py warm in a background process for fast rebuilds.
+
+The daemon imports build_site once and serves build requests over a local
+Unix socket, so each rebuild skips interpreter startup and reuses the parsed
+manifest, compiled templates and page shells, the mistune renderer, rendered
+notes (see render.py) and the extracted source sections. The build's output
+is sent back line by line as it is printed. Edits to notes.json, templates/,
+the --books file and each of its books' manifests and source HTML are picked
+up on the next request; edits to the Python scripts need a restart.
+
+Usage:
+  python build_daemon.py serve              # run the daemon
+  python build_daemon.py build [ARGS...]    # rebuild; ARGS go to build_site.py
+  python build_daemon.py stop
+"""
+
+import argparse, importlib, io, json, socket, sys, traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+SOCKET_PATH = ROOT / ".build" / "daemon.sock"
+
+# Inputs whose changes mean the cached manifest and templates are stale
+WATCHED = [ROOT / "notes.json", ROOT / "templates"]
+
+EXIT_PREFIX = "\0exit "
+
+
+def watched_paths(build_site, argv):
+    """WATCHED, plus the --books file in argv and its books' manifests."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--books', type=Path)
+    books_file = parser.parse_known_args(argv)[0].books
+    if books_file is None or not books_file.exists():
+        return WATCHED
+    try:
+        books = build_site.load_books(books_file)
+    except (SystemExit, ValueError):  # the build reports what is wrong with it
+        books = []
+    return [*WATCHED, books_file, *(book.manifest for book in books)]
+
+
+def watched_mtimes(paths=WATCHED):
+    mtimes = {}
+    for path in paths:
+        for p in [path, *path.glob('*')] if path.is_dir() else [path]:
+            if p.exists():
+                mtimes[p] = p.stat().st_mtime_ns
+    return mtimes
+
+
+class LineWriter(io.TextIOBase):
+    """Send text to the client's socket, each complete line as it comes.
+
+    Nothing is buffered past the last newline, so nothing is left to send
+    when the connection closes. If the client goes away the build carries
+    on, its output dropped.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pending = ''
+        self.gone = False
+
+    def write(self, text):
+        if self.gone:
+            return len(text)
+        lines, newline, self.pending = (self.pending + text).rpartition('\n')
+        if newline:
+            try:
+                self.conn.sendall((lines + newline).encode('utf-8'))
+            except OSError:
+                self.gone = True
+                self.pending = ''
+        return len(text)
+
+
+def run_build(build_site, argv, out):
+    """Run build_site.main(argv), printing to out; return its exit code."""
+    code = 0
+    with redirect_stdout(out), redirect_stderr(out):
+        try:
+            build_site.main(argv)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+            if e.code and not isinstance(e.code, int):
+                print(e.code)
+        except Exception:
+            traceback.print_exc(file=out)
+            code = 1
+    return code
+
+
+def serve():
+    if not hasattr(socket, 'AF_UNIX'):
+        sys.exit("The build daemon needs Unix domain sockets")
+    # Imported up front so the first build finds them warm
+    import build_site, epub  # noqa: F401
+
+    SOCKET_PATH.parent.mkdir(exist_ok=True)
+    SOCKET_PATH.unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(SOCKET_PATH))
+    server.listen()
+    print(f"Build daemon listening on {SOCKET_PATH}")
+
+    mtimes = watched_mtimes()
+    try:
+        while True:
+            conn, _ = server.accept()
+            out = LineWriter(conn)
+            # A client that hangs up or sends garbage fails only its own request
+            try:
+                with conn, conn.makefile('r', encoding='utf-8') as stream:
+                    request = json.loads(stream.readline())
+                    if not isinstance(request, dict):
+                        raise ValueError(f"not a request: {request!r}")
+                    if request.get('stop'):
+                        out.write(f"Build daemon stopped\n{EXIT_PREFIX}0\n")
+                        break
+                    mtimes, code = handle(request['argv'], out, mtimes)
+                    print(f"build {' '.join(request['argv'])} -> exit {code}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"request failed: {e!r}")
+    finally:
+        server.close()
+        SOCKET_PATH.unlink(missing_ok=True)
+
+
+def handle(argv, out, mtimes):
+    """Run one build for a client, reloading the modules first if their
+    inputs changed; return the new mtimes and the exit code."""
+    import manifest, templating, render, build_references, build_site, epub
+
+    current = watched_mtimes(watched_paths(build_site, argv))
+    # A file first seen now can't have been loaded before
+    if any(mtimes.get(path, mtime) != mtime for path, mtime in current.items()):
+        # A manifest or template changed: start from fresh caches
+        for module in (manifest, templating, render,
+                       build_references, build_site, epub):
+            importlib.reload(module)
+
+    code = run_build(build_site, argv, out)
+    out.write(f"{EXIT_PREFIX}{code}\n")
+    return {**mtimes, **current}, code
+
+
+def send(request):
+    """Send a request to the daemon, echo its output, and return its exit code."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(SOCKET_PATH))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit("No build daemon running; start one with: python build_daemon.py serve")
+    with client, client.makefile('rw', encoding='utf-8') as stream:
+        stream.write(json.dumps(request) + '\n')
+        stream.flush()
+        for line in stream:
+            if line.startswith(EXIT_PREFIX):
+                return int(line[len(EXIT_PREFIX):])
+            sys.stdout.write(line)
+            sys.stdout.flush()
+    return 1
+
+
+def main():
+    command, *args = sys.argv[1:] or ['']
+    if command == 'serve':
+        serve()
+    elif command == 'build':
+        sys.exit(send({'argv': args}))
+    elif command == 'stop':
+        sys.exit(send({'stop': True}))
+    else:
+        sys.exit(__doc__)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,607 +5,134 @@ Generates:
   - index.html          (Introduction / landing)
   - ch1.html .. ch5.html (Five chapters)
   - conclusion.html     (Conclusion + Further Reading link)
-  - references/index.html  (Index of all 43 source notes)
+  - references/index.html  (Index of all source notes)
   - references/<slug>.html (Individual reference pages)
+  - sw.js + precache-manifest.json (Offline service worker)
+  - sitemap.xml + feed.xml (Sitemap, and Atom feed of the updates log)
+  - aris-big-five.epub  (E-book export, only with --only epub; see epub.py)
+
+Page templates and stylesheets live in templates/ (see templating.py).
 
 Usage:
-  python build_site.py
+  python build_site.py [--vault PATH] [--read-ahead N] [--since REV]
+                       [--only TARGET[,TARGET...]] [--dry-run [--diff]]
+                       [--preview NAME] [--books FILE]
+
+Notes are read from the vault folder if present, else from vault.pack
+(see vault.py); --vault points at either explicitly. --since REV rebuilds
+only the reference pages for notes git reports as changed since REV, plus
+the references index. --only builds just the named targets, e.g.
+--only ch3, --only refs:resilience, --only updates (see parse_targets).
+--dry-run builds everything in memory and reports what would change on disk.
+--preview NAME also snapshots the built site as a preview under
+.build/previews/NAME/, sharing unchanged files with other previews (see
+blobs.py).
+--books FILE builds each book listed in FILE (see load_books) in turn, in one
+process that shares the note reading pool, rendered notes and templates.
+A build that dies partway picks up where it stopped when rerun with the same
+arguments (see journal.py).
+Every page written is checked for well-formed HTML as it is written (see
+validate_html.py), and every build ends by checking the links in the whole
+site (see check_links.py).
 """
 
-import re, shutil
+import argparse, hashlib, json, re, shutil, time
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
-import mistune
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import build_references, validate_html
+from journal import JOURNAL, close_journal, completed, open_journal, record
+from manifest import MANIFEST_FILE, load_manifest, slugify, use_manifest
+from output import (OBSERVERS, dry_running, keep_output, open_output,
+                    report_dry_run, set_dry_run, write_output)
+from templating import TEMPLATE_DIR, load_asset, load_template
+from render import RenderedNote, normalize_dashes, render_notes
+from vault import READ_AHEAD, changed_notes, open_vault
 
 ROOT = Path(__file__).parent
-SRC_HTML = ROOT / "index_source.html"      # original single-page (renamed)
-VAULT_DIR = Path(r"C:\Users\Tim\Documents\Ari\Aris place\Aris big five")
-REF_DIR = ROOT / "references"
-
-# ── Reference files in chapter order ──────────────────────────────────
-REFERENCED_FILES = [
-    # Ch1: Identity
-    "Identity and Standards", "The Giant Is You", "The Shame Gap",
-    "The Gaining of Maturity", "The big mountain", "The Braces Paradox",
-    "Privilege", "Identity and Self", "People Change", "Moon Shot",
-    # Ch2: Adversity
-    "Ad astra", "Good Timber", "The fight", "Resilience",
-    "Character comes from imperfections", "Grief and Loss",
-    "Anxiety and Waiting", "Career and Ambition", "Seasons of Life",
-    "The psychology of sideways",
-    # Ch3: Compounding
-    "Investment Philosophy", "Systems over Goals", "Taking Action",
-    "Dopamine and Effort", "Level Up Mindset", "Money life as sport",
-    "Success Mindset", "How to Win", "Sales Philosophy",
-    # Ch4: Trust
-    "Trust Equation", "PEACE Framework",
-    "Explaining something is like playing catch", "Communication Tips",
-    "Leadership Insights", "Management Principles",
-    "Hold the Knife by the Handle", "Value of Advice", "Referral Framework",
-    # Ch5: Legacy
-    "Temporal Love", "Parenting Wisdom",
-    "Kids aren't a barrier to our happiness. They are a doorway",
-    "Family Values", "Legacy and Wealth Transfer",
-]
-
-CHAPTER_MAP = {
-    "Identity and Standards": 1, "The Giant Is You": 1, "The Shame Gap": 1,
-    "The Gaining of Maturity": 1, "The big mountain": 1, "The Braces Paradox": 1,
-    "Privilege": 1, "Identity and Self": 1, "People Change": 1, "Moon Shot": 1,
-    "Ad astra": 2, "Good Timber": 2, "The fight": 2, "Resilience": 2,
-    "Character comes from imperfections": 2, "Grief and Loss": 2,
-    "Anxiety and Waiting": 2, "Career and Ambition": 2, "Seasons of Life": 2,
-    "The psychology of sideways": 2,
-    "Investment Philosophy": 3, "Systems over Goals": 3, "Taking Action": 3,
-    "Dopamine and Effort": 3, "Level Up Mindset": 3, "Money life as sport": 3,
-    "Success Mindset": 3, "How to Win": 3, "Sales Philosophy": 3,
-    "Trust Equation": 4, "PEACE Framework": 4,
-    "Explaining something is like playing catch": 4, "Communication Tips": 4,
-    "Leadership Insights": 4, "Management Principles": 4,
-    "Hold the Knife by the Handle": 4, "Value of Advice": 4, "Referral Framework": 4,
-    "Temporal Love": 5, "Parenting Wisdom": 5,
-    "Kids aren't a barrier to our happiness. They are a doorway": 5,
-    "Family Values": 5, "Legacy and Wealth Transfer": 5,
-}
-
-CHAPTER_TITLES = {
-    1: "The Giant Within",
-    2: "Through, Not Around",
-    3: "The First Rule of Compounding",
-    4: "The Thrower Adapts",
-    5: "Love in Finite Time",
-}
-
-CHAPTER_SUBS = {
-    1: "On identity, standards, and the person you're becoming",
-    2: "On adversity, resilience, and the forge that makes you",
-    3: "On systems, patience, and the life that grows like interest",
-    4: "On trust, communication, and the architecture of connection",
-    5: "On legacy, parenting, and the urgency of presence",
-}
-
-CHAPTER_WORDS = {
-    1: "One", 2: "Two", 3: "Three", 4: "Four", 5: "Five",
-}
+
+
+# ── Books ────────────────────────────────────────────────────────────
+class Book(NamedTuple):
+    name: str
+    title: str      # in the sidebar, page titles, feed and EPUB
+    manifest: Path  # chapters and notes, like notes.json (see manifest.py)
+    source: Path    # the single-page HTML the main pages are extracted from
+    out: Path       # where the site is written
+    url: str        # where it is published; sitemap and feed URLs are absolute
+    updates: Path = None  # its changelog (see load_updates); None for none
+    author: str = ""      # for the feed and EPUB; else the title stands in
+    credit: str = ""      # the page footer's line; else the title
+
+
+DEFAULT_BOOK = Book("aris-big-five", "Ari's Big Five", MANIFEST_FILE,
+                    ROOT / "index_source.html",  # original single-page (renamed)
+                    ROOT, "https://tfvandoore.github.io/aris-big-five/",
+                    ROOT / "updates.jsonl", "Ari", "Written by Ari, February 2026")
+
+
+def load_books(path):
+    """The books listed in a JSON file.
+
+    The file is a list of {"name", "title", "manifest", "source", "out",
+    "url"}, with paths relative to the file, and optionally "updates",
+    "author" and "credit" (see Book). An entry naming the default book may
+    leave out the rest, which then default to this site's.
+    """
+    base = Path(path).parent
+    books = []
+    for entry in json.loads(Path(path).read_text(encoding='utf-8')):
+        fields = DEFAULT_BOOK._asdict() if entry['name'] == DEFAULT_BOOK.name else {}
+        fields.update(entry)
+        for field in ('manifest', 'source', 'out', 'updates'):
+            if entry.get(field) is not None:
+                fields[field] = (base / entry[field]).resolve()
+        missing = [field for field in Book._fields
+                   if field not in fields and field not in Book._field_defaults]
+        if missing:
+            raise SystemExit(f"{path}: book {entry['name']!r} has no {', '.join(missing)}")
+        books.append(Book(**fields))
+    return books
+
+
+def use_book(book):
+    """Point the build at a book: its manifest, source HTML and output paths."""
+    global BOOK, SITE, SRC_HTML, REF_DIR, SW_JS, PRECACHE_MANIFEST, SITEMAP, FEED
+    global STATE, SITE_URL, FEED_TAG
+    BOOK = book
+    SITE = book.out
+    SRC_HTML = book.source
+    REF_DIR = SITE / "references"
+    SW_JS = SITE / "sw.js"
+    PRECACHE_MANIFEST = SITE / "precache-manifest.json"
+    SITEMAP = SITE / "sitemap.xml"
+    FEED = SITE / "feed.xml"
+    # Build state (caches, journal, history); other books keep theirs apart
+    STATE = ROOT / ".build"
+    if book.name != DEFAULT_BOOK.name:
+        STATE = STATE / "books" / book.name
+    SITE_URL = book.url
+    FEED_TAG = urlsplit(book.url).hostname
+    use_manifest(book.manifest)
+
+
+use_book(DEFAULT_BOOK)
+
 
 # ── Navigation structure ─────────────────────────────────────────────
-NAV_ITEMS = [
-    ("index.html",      "Introduction",                   None),
-    ("ch1.html",        "The Giant Within",                "Chapter 1"),
-    ("ch2.html",        "Through, Not Around",             "Chapter 2"),
-    ("ch3.html",        "The First Rule of Compounding",   "Chapter 3"),
-    ("ch4.html",        "The Thrower Adapts",              "Chapter 4"),
-    ("ch5.html",        "Love in Finite Time",             "Chapter 5"),
-    ("conclusion.html", "Conclusion & Further Reading",    None),
-]
-
-
-def slugify(name: str) -> str:
-    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
-
-
-# ── Shared CSS ────────────────────────────────────────────────────────
-SHARED_CSS = '''
-:root {
-    --text: #1a1a1a;
-    --text-secondary: #5c564e;
-    --bg: #faf8f4;
-    --bg-card: #fff;
-    --accent: #b08d57;
-    --accent-hover: #96763f;
-    --accent-light: #f5f0e6;
-    --border: #ddd8cf;
-    --quote-bg: #f8f5ee;
-    --quote-border: #c9a96e;
-    --ref: #8a6d2f;
-    --ref-bg: #f3edd9;
-    --ref-hover: #e8dfc8;
-    --sidebar-bg: #f4f1ea;
-    --sidebar-width: 280px;
-    --hero-gradient-1: #1e2d3d;
-    --hero-gradient-2: #0d1821;
-}
-
-* { box-sizing: border-box; margin: 0; padding: 0; }
-html { scroll-behavior: smooth; font-size: 18px; }
-
-body {
-    font-family: 'Georgia', 'Times New Roman', serif;
-    color: var(--text);
-    background: var(--bg);
-    line-height: 1.75;
-    -webkit-font-smoothing: antialiased;
-}
-
-/* ── Sidebar ── */
-.sidebar {
-    width: var(--sidebar-width);
-    position: fixed;
-    top: 0; left: 0; bottom: 0;
-    background: var(--sidebar-bg);
-    border-right: 1px solid var(--border);
-    overflow-y: auto;
-    padding: 1.5rem 0;
-    z-index: 100;
-}
-
-.sidebar-brand {
-    padding: 0.5rem 1.5rem 1.5rem;
-    border-bottom: 1px solid var(--border);
-    margin-bottom: 1rem;
-}
-
-.sidebar-brand a {
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 1.1rem;
-    font-weight: 600;
-    color: var(--accent);
-    text-decoration: none;
-}
-
-.sidebar-brand .brand-sub {
-    display: block;
-    font-family: 'Georgia', serif;
-    font-size: 0.75rem;
-    color: var(--text-secondary);
-    font-style: italic;
-    margin-top: 0.2rem;
-}
-
-.sidebar nav ul {
-    list-style: none;
-    padding: 0;
-}
-
-.sidebar nav li {
-    margin: 0;
-}
-
-.sidebar nav a {
-    display: block;
-    padding: 0.55rem 1.5rem;
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.82rem;
-    color: var(--text);
-    text-decoration: none;
-    border-left: 3px solid transparent;
-    transition: all 0.15s;
-}
-
-.sidebar nav a:hover {
-    background: var(--accent-light);
-    color: var(--accent);
-}
-
-.sidebar nav a.active {
-    background: var(--accent-light);
-    color: var(--accent);
-    border-left-color: var(--accent);
-    font-weight: 600;
-}
-
-.sidebar nav .nav-label {
-    display: block;
-    font-size: 0.7rem;
-    text-transform: uppercase;
-    letter-spacing: 0.1em;
-    color: var(--text-secondary);
-    opacity: 0.7;
-}
-
-.sidebar-ref-link {
-    padding: 1rem 1.5rem;
-    border-top: 1px solid var(--border);
-    margin-top: 1rem;
-}
-
-.sidebar-ref-link a {
-    display: block;
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.8rem;
-    color: var(--accent);
-    text-decoration: none;
-    padding: 0.5rem 1rem;
-    background: var(--accent-light);
-    border-radius: 6px;
-    text-align: center;
-    transition: background 0.2s;
-}
-
-.sidebar-ref-link a:hover {
-    background: var(--ref-hover);
-}
-
-/* ── Mobile menu toggle ── */
-.menu-toggle {
-    display: none;
-    position: fixed;
-    top: 1rem; left: 1rem;
-    z-index: 200;
-    background: var(--accent);
-    color: #fff;
-    border: none;
-    border-radius: 6px;
-    padding: 0.5rem 0.75rem;
-    font-size: 1.2rem;
-    cursor: pointer;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.15);
-}
-
-/* ── Main content ── */
-.main-content {
-    margin-left: var(--sidebar-width);
-    min-height: 100vh;
-}
-
-/* ── Hero ── */
-.hero {
-    background: linear-gradient(135deg, var(--hero-gradient-1), var(--hero-gradient-2));
-    color: #fff;
-    padding: 4rem 2rem 3rem;
-    text-align: center;
-}
-
-.hero h1 {
-    font-size: 2.5rem;
-    font-weight: 400;
-    letter-spacing: 0.02em;
-    margin-bottom: 0.4rem;
-}
-
-.hero .subtitle {
-    font-style: italic;
-    font-size: 1.05rem;
-    opacity: 0.85;
-    margin-bottom: 1rem;
-}
-
-.hero .epigraph {
-    max-width: 600px;
-    margin: 0 auto;
-    font-style: italic;
-    font-size: 0.9rem;
-    opacity: 0.7;
-    border-top: 1px solid rgba(255,255,255,0.2);
-    padding-top: 1.25rem;
-}
-
-/* ── Container ── */
-.container {
-    max-width: 720px;
-    margin: 0 auto;
-    padding: 0 1.5rem;
-}
-
-/* ── Chapter content ── */
-.chapter-content {
-    max-width: 720px;
-    margin: 3rem auto;
-    padding: 0 1.5rem;
-}
-
-.chapter-header {
-    text-align: center;
-    margin-bottom: 2.5rem;
-    padding-bottom: 1.5rem;
-    border-bottom: 1px solid var(--border);
-}
-
-.chapter-number {
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.8rem;
-    text-transform: uppercase;
-    letter-spacing: 0.15em;
-    color: var(--accent);
-    margin-bottom: 0.3rem;
-}
-
-.chapter-header h2 {
-    font-size: 2rem;
-    font-weight: 400;
-    margin-bottom: 0.3rem;
-}
-
-.chapter-header .chapter-sub {
-    font-style: italic;
-    color: var(--text-secondary);
-    font-size: 1rem;
-}
-
-/* ── Typography ── */
-h3 {
-    font-size: 1.3rem;
-    font-weight: 400;
-    margin: 2.5rem 0 1rem;
-    color: var(--text);
-}
-
-p { margin-bottom: 1.25rem; }
-strong { font-weight: 700; }
-em { font-style: italic; }
-
-ul, ol { margin-bottom: 1.25rem; padding-left: 1.5rem; }
-li { margin-bottom: 0.3rem; }
-
-/* ── Vault references ── */
-.ref {
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.82rem;
-    background: var(--ref-bg);
-    color: var(--ref);
-    padding: 0.15em 0.5em;
-    border-radius: 3px;
-    white-space: nowrap;
-    font-weight: 500;
-    text-decoration: none;
-    transition: background 0.2s;
-}
-
-.ref:hover { background: var(--ref-hover); }
-a.ref { text-decoration: none; }
-
-/* ── Blockquotes ── */
-blockquote {
-    border-left: 3px solid var(--quote-border);
-    background: var(--quote-bg);
-    padding: 1.25rem 1.5rem;
-    margin: 2rem 0;
-    border-radius: 0 6px 6px 0;
-    font-style: italic;
-}
-
-blockquote p { margin-bottom: 0; }
-
-blockquote .attribution {
-    display: block;
-    text-align: right;
-    font-size: 0.85rem;
-    color: var(--text-secondary);
-    margin-top: 0.5rem;
-    font-style: normal;
-}
-
-/* ── Equation ── */
-.equation {
-    text-align: center;
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 1.05rem;
-    letter-spacing: 0.03em;
-    color: var(--accent);
-    margin: 1.5rem 0;
-    font-weight: 600;
-}
-
-/* ── Diamond items ── */
-.diamond-item {
-    padding-left: 1.2rem;
-    border-left: 3px solid var(--accent-light);
-    margin-bottom: 1.25rem;
-}
-
-/* ── Observation items ── */
-.observation {
-    padding-left: 1.2rem;
-    border-left: 3px solid var(--quote-border);
-    margin-bottom: 1.25rem;
-}
-
-/* ── Arc list (intro) ── */
-.arc-list { list-style: none; padding: 0; margin: 1.5rem 0; }
-
-.arc-list li {
-    margin-bottom: 0.4rem;
-    padding-left: 1.5rem;
-    position: relative;
-}
-
-.arc-list li::before {
-    content: "";
-    position: absolute;
-    left: 0; top: 0.6em;
-    width: 8px; height: 8px;
-    border-radius: 50%;
-    background: var(--accent);
-}
-
-.arc-flow {
-    text-align: center;
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.9rem;
-    letter-spacing: 0.1em;
-    color: var(--text-secondary);
-    margin: 1.5rem 0 2rem;
-}
-
-/* ── Dividers ── */
-hr {
-    border: none;
-    border-top: 1px solid var(--border);
-    margin: 3rem auto;
-    max-width: 720px;
-}
-
-/* ── Page nav (prev/next) ── */
-.page-nav {
-    display: flex;
-    justify-content: space-between;
-    max-width: 720px;
-    margin: 3rem auto 2rem;
-    padding: 0 1.5rem;
-    gap: 1rem;
-}
-
-.page-nav a {
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.85rem;
-    color: var(--accent);
-    text-decoration: none;
-    padding: 0.6rem 1.2rem;
-    border: 1px solid var(--border);
-    border-radius: 6px;
-    transition: all 0.2s;
-    max-width: 48%;
-}
-
-.page-nav a:hover {
-    background: var(--accent-light);
-    border-color: var(--accent);
-}
-
-.page-nav .prev::before { content: "\\2190  "; }
-.page-nav .next::after { content: "  \\2192"; }
-.page-nav .spacer { flex: 1; }
-
-/* ── Footer ── */
-.footer {
-    text-align: center;
-    padding: 2rem 1.5rem 3rem;
-    color: var(--text-secondary);
-    font-size: 0.85rem;
-    max-width: 720px;
-    margin: 0 auto;
-}
-
-/* ── Reference note page ── */
-.note-content {
-    max-width: 720px;
-    margin: 2.5rem auto;
-    padding: 0 1.5rem;
-}
-
-.note-content h2 {
-    font-size: 1.6rem;
-    font-weight: 400;
-    margin-bottom: 1.5rem;
-    color: var(--text);
-    border-bottom: 1px solid var(--border);
-    padding-bottom: 0.5rem;
-}
-
-.note-content h1 { font-size: 1.4rem; font-weight: 400; margin: 1.5rem 0 1rem; }
-.note-content h3 { font-size: 1.15rem; font-weight: 700; margin: 2rem 0 0.75rem; }
-.note-content h4 { font-size: 1rem; font-weight: 700; margin: 1.5rem 0 0.5rem; }
-
-.back-link-bar {
-    max-width: 720px;
-    margin: 0 auto;
-    padding: 1.5rem 1.5rem 0;
-}
-
-.back-link-bar a {
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.85rem;
-    color: var(--accent);
-    text-decoration: none;
-}
-
-.back-link-bar a:hover { text-decoration: underline; }
-
-/* ── References index cards ── */
-.ref-grid {
-    max-width: 720px;
-    margin: 0 auto;
-    padding: 0 1.5rem;
-}
-
-.ref-chapter-group {
-    margin-bottom: 2.5rem;
-}
-
-.ref-chapter-label {
-    font-family: 'Helvetica Neue', 'Arial', sans-serif;
-    font-size: 0.8rem;
-    text-transform: uppercase;
-    letter-spacing: 0.12em;
-    color: var(--accent);
-    background: var(--accent-light);
-    display: inline-block;
-    padding: 0.35em 1em;
-    border-radius: 20px;
-    margin-bottom: 1rem;
-}
-
-.ref-list {
-    list-style: none;
-    padding: 0;
-}
-
-.ref-list li {
-    margin-bottom: 0.4rem;
-}
-
-.ref-list a {
-    font-size: 0.95rem;
-    color: var(--text);
-    text-decoration: none;
-    border-bottom: 1px solid transparent;
-    transition: all 0.2s;
-}
-
-.ref-list a:hover {
-    color: var(--accent);
-    border-bottom-color: var(--accent);
-}
-
-/* ── CTA button ── */
-.cta-button {
-    display: inline-block;
-    font-family: 'Helvetica Neue', Arial, sans-serif;
-    background: var(--accent);
-    color: #fff;
-    padding: 0.75em 2em;
-    border-radius: 6px;
-    text-decoration: none;
-    font-size: 0.95rem;
-    transition: background 0.2s;
-}
-
-.cta-button:hover { background: var(--accent-hover); }
-
-/* ── Responsive ── */
-@media (max-width: 900px) {
-    .sidebar {
-        transform: translateX(-100%);
-        transition: transform 0.3s;
-        box-shadow: none;
-    }
-    .sidebar.open {
-        transform: translateX(0);
-        box-shadow: 4px 0 20px rgba(0,0,0,0.15);
-    }
-    .menu-toggle { display: block; }
-    .main-content { margin-left: 0; }
-    .hero { padding: 3.5rem 1.5rem 2.5rem; }
-    .hero h1 { font-size: 2rem; }
-}
-
-@media (max-width: 600px) {
-    html { font-size: 16px; }
-    .hero { padding: 3rem 1rem 2rem; }
-    .hero h1 { font-size: 1.6rem; }
-    .page-nav { flex-direction: column; }
-    .page-nav a { max-width: 100%; }
-}
-'''
+@lru_cache(maxsize=None)
+def nav_items():
+    """(href, title, label) for each page in reading order."""
+    return (
+        [("index.html", "Introduction", None)]
+        + [(f"ch{ch.number}.html", ch.title, f"Chapter {ch.number}")
+           for ch in load_manifest().chapters]
+        + [("conclusion.html", "Conclusion & Further Reading", None)]
+    )
+
 
 # ── JavaScript for mobile menu ───────────────────────────────────────
 MENU_JS = '''
@@ -619,19 +146,18 @@ document.querySelector('.main-content').addEventListener('click', function() {
 </script>
 '''
 
-
 def build_sidebar(active_href, is_subdir=False):
     """Build sidebar HTML. is_subdir=True for references/ pages."""
     prefix = "../" if is_subdir else ""
     lines = [
         '<aside class="sidebar">',
         '  <div class="sidebar-brand">',
-        f'    <a href="{prefix}index.html">Ari\'s Big Five</a>',
+        f'    <a href="{prefix}index.html">{BOOK.title}</a>',
         '    <span class="brand-sub">A thesis on the Nexus vault</span>',
         '  </div>',
         '  <nav><ul>',
     ]
-    for href, title, label in NAV_ITEMS:
+    for href, title, label in nav_items():
         full_href = f"{prefix}{href}"
         cls = ' class="active"' if href == active_href else ''
         label_html = f'<span class="nav-label">{label}</span>' if label else ''
@@ -639,39 +165,52 @@ def build_sidebar(active_href, is_subdir=False):
     lines += [
         '  </ul></nav>',
         '  <div class="sidebar-ref-link">',
-        f'    <a href="{prefix}references/index.html">Source Notes (43) &rarr;</a>',
+        f'    <a href="{prefix}references/index.html">'
+        f'Source Notes ({len(load_manifest().notes)}) &rarr;</a>',
         '  </div>',
         '</aside>',
     ]
     return '\n'.join(lines)
 
 
-def page_template(title, body_html, active_href, is_subdir=False, description=""):
-    """Wrap body content in the full page template."""
-    sidebar = build_sidebar(active_href, is_subdir)
-    desc = description or "A thesis on the most valuable ideas in the Nexus."
-    return f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <meta name="description" content="{desc}">
-    <style>{SHARED_CSS}</style>
-</head>
-<body>
+@lru_cache(maxsize=None)
+def page_shell(active_href, is_subdir=False):
+    """Compile the page shell once per (active_href, is_subdir) variant.
 
-<button class="menu-toggle" aria-label="Toggle navigation">&#9776;</button>
+    Returns the placeholder names left for page_template() to fill in and the
+    dash-normalized, encoded literal segments between them.
+    """
+    shell = load_template("page.html").partial(
+        css=load_asset("site.css"),
+        sidebar=build_sidebar(active_href, is_subdir),
+        menu_js=MENU_JS,
+        prefix="../" if is_subdir else "",
+    )
+    segments = tuple(normalize_dashes(lit).encode('utf-8') for lit in shell.literals)
+    return shell.names, segments
 
-{sidebar}
 
-<div class="main-content">
-{body_html}
-</div>
+def page_template(title, body_html, active_href, is_subdir=False, description="",
+                  prefetch=()):
+    """Wrap body content in the full page template, yielding encoded chunks.
 
-{MENU_JS}
-</body>
-</html>'''
+    prefetch is a list of hrefs (relative to the page) the reader is likely
+    to open next; they are emitted as <link rel="prefetch"> hints. Only the
+    per-page parts are dash-normalized here; the shell already is.
+    """
+    desc = description or "A thesis on the most valuable ideas in the Nexus."
+    hints = ''.join(f'\n    <link rel="prefetch" href="{href}">' for href in prefetch)
+    parts = {
+        'title': normalize_dashes(title),
+        'desc': normalize_dashes(desc),
+        'hints': hints,
+        'body': normalize_dashes(body_html),
+    }
+    names, segments = page_shell(active_href, is_subdir)
+    yield segments[0]
+    for name, segment in zip(names, segments[1:]):
+        yield parts[name].encode('utf-8')
+        yield segment
 
 
 def build_page_nav(idx, items):
@@ -693,30 +232,29 @@ def build_page_nav(idx, items):
 
 FOOTER_HTML = '''
 <footer class="footer">
-    <p class="credit">Written by Ari, February 2026</p>
+    <p class="credit">{credit}</p>
 </footer>
 '''
 
 
 # ── Extract content from original single-page HTML ───────────────────
 def extract_sections(html):
-    """Extract each section's inner HTML from the original index.html."""
+    """Extract each section's inner HTML from the original index.html.
+
+    The book's chapters (from its manifest) come between the introduction
+    and the conclusion, each marked by a CHAPTER <n> comment.
+    """
+    heads = ['INTRODUCTION',
+             *(f'CHAPTER {ch.number}' for ch in load_manifest().chapters),
+             'CONCLUSION']
+    keys = ['intro', *(f'ch{ch.number}' for ch in load_manifest().chapters)]
     markers = {
-        'intro':      (r'<!-- ============ INTRODUCTION ============ -->\s*',
-                       r'\s*<hr[^>]*>\s*<!-- ============ CHAPTER 1'),
-        'ch1':        (r'<!-- ============ CHAPTER 1 ============ -->\s*',
-                       r'\s*<hr[^>]*>\s*<!-- ============ CHAPTER 2'),
-        'ch2':        (r'<!-- ============ CHAPTER 2 ============ -->\s*',
-                       r'\s*<hr[^>]*>\s*<!-- ============ CHAPTER 3'),
-        'ch3':        (r'<!-- ============ CHAPTER 3 ============ -->\s*',
-                       r'\s*<hr[^>]*>\s*<!-- ============ CHAPTER 4'),
-        'ch4':        (r'<!-- ============ CHAPTER 4 ============ -->\s*',
-                       r'\s*<hr[^>]*>\s*<!-- ============ CHAPTER 5'),
-        'ch5':        (r'<!-- ============ CHAPTER 5 ============ -->\s*',
-                       r'\s*<hr[^>]*>\s*<!-- ============ CONCLUSION'),
-        'conclusion': (r'<!-- ============ CONCLUSION ============ -->\s*',
-                       r'\s*<!-- ============ FURTHER READING'),
+        key: (rf'<!-- ============ {head} ============ -->\s*',
+              rf'\s*<hr[^>]*>\s*<!-- ============ {following}\b')
+        for key, head, following in zip(keys, heads, heads[1:])
     }
+    markers['conclusion'] = (r'<!-- ============ CONCLUSION ============ -->\s*',
+                             r'\s*<!-- ============ FURTHER READING')
     sections = {}
     for key, (start_pat, end_pat) in markers.items():
         m = re.search(start_pat + r'(.*?)' + end_pat, html, re.DOTALL)
@@ -728,405 +266,917 @@ def extract_sections(html):
     return sections
 
 
-def fix_ref_links(html):
-    """Convert references.html#slug links to references/slug.html links."""
-    return re.sub(
-        r'href="references\.html#([^"]+)"',
-        r'href="references/\1.html"',
-        html
-    )
+# Ref link counts per main page, filled in by fix_ref_links() and used to
+# rank prefetch hints: {"ch1.html": Counter({"the-giant-is-you": 4, ...})}
+REF_LINK_COUNTS = {}
 
+# How many of the most-linked reference notes to prefetch per page
+PREFETCH_REFS = 3
+
+
+def fix_ref_links(html, page=None):
+    """Convert references.html#slug links to references/slug.html links.
+
+    If page is given, the slugs linked from it are counted in REF_LINK_COUNTS.
+    """
+    counts = REF_LINK_COUNTS.setdefault(page, Counter()) if page else None
+
+    def replace(m):
+        if counts is not None:
+            counts[m.group(1)] += 1
+        return f'href="references/{m.group(1)}.html"'
+    return re.sub(r'href="references\.html#([^"]+)"', replace, html)
 
-def fix_ref_links_from_subdir(html):
-    """For pages inside references/, convert references.html#slug to slug.html."""
-    return re.sub(
-        r'href="references\.html#([^"]+)"',
-        r'href="\1.html"',
-        html
-    )
+
+def ref_link_counts(page):
+    """Ref link counts for a main page, from this run or else its built file."""
+    if page not in REF_LINK_COUNTS:
+        path = SITE / page
+        html = path.read_text(encoding='utf-8') if path.exists() else ''
+        REF_LINK_COUNTS[page] = Counter(
+            re.findall(r'href="references/([^"/]+)\.html" class="ref"', html))
+    return REF_LINK_COUNTS[page]
+
+
+def top_linked_refs(page, exclude=None):
+    """Return the PREFETCH_REFS reference slugs most linked from a main page."""
+    counts = ref_link_counts(page)
+    ranked = [slug for slug, _ in counts.most_common()
+              if slug in load_manifest().by_slug and slug != exclude]
+    return ranked[:PREFETCH_REFS]
+
+
+def main_page_prefetch(idx):
+    """Prefetch hints for nav_items()[idx]: the next page, then its top refs."""
+    items = nav_items()
+    href = items[idx][0]
+    hints = [items[idx + 1][0]] if idx < len(items) - 1 else []
+    hints += [f"references/{slug}.html" for slug in top_linked_refs(href)]
+    return hints
 
 
 # ── Build main pages ─────────────────────────────────────────────────
-def build_main_pages(sections):
-    """Generate the 7 main pages."""
+def main_page_bodies(sections, pages=None, site=True):
+    """Yield (href, title, body) for the 7 main pages, or just the hrefs in pages.
+
+    site=False leaves out the page nav and footer and doesn't count ref links,
+    for exports that bring their own navigation (see epub.py).
+    """
+    def wanted(href):
+        return pages is None or href in pages
+
+    def chrome(idx):
+        if not site:
+            return {'page_nav': '', 'footer': ''}
+        return {'page_nav': build_page_nav(idx, nav_items()),
+                'footer': FOOTER_HTML.format(credit=BOOK.credit or BOOK.title)}
+
+    def ref_links(html, href):
+        return fix_ref_links(html, href if site else None)
 
     # 1. Introduction / landing page
-    intro_body = f'''
-<header class="hero">
-    <h1>Ari's Big Five</h1>
-    <p class="subtitle">A thesis on the most valuable ideas in the Nexus</p>
-    <p class="epigraph">"Note taking is documenting encounters. Without synthesis, the only expression is further note taking."</p>
-</header>
-
-<div class="chapter-content">
-{fix_ref_links(sections['intro'])}
-</div>
-
-{build_page_nav(0, NAV_ITEMS)}
-{FOOTER_HTML}
-'''
-    write_page(ROOT / "index.html", "Ari's Big Five", intro_body, "index.html")
+    if wanted("index.html"):
+        intro_body = load_template("intro.html").render(
+            content=ref_links(sections['intro'], 'index.html'),
+            book_title=BOOK.title,
+            **chrome(0),
+        )
+        yield "index.html", BOOK.title, intro_body
 
     # 2–6. Chapter pages
-    for ch in range(1, 6):
+    for chapter in load_manifest().chapters:
+        ch = chapter.number
+        if not wanted(f"ch{ch}.html"):
+            continue
         key = f'ch{ch}'
-        content = fix_ref_links(sections[key])
-        ch_body = f'''
-<header class="hero">
-    <h1>{CHAPTER_TITLES[ch]}</h1>
-    <p class="subtitle">Chapter {CHAPTER_WORDS[ch]} - {CHAPTER_SUBS[ch]}</p>
-</header>
-
-<div class="chapter-content">
-{content}
-</div>
-
-{build_page_nav(ch, NAV_ITEMS)}
-{FOOTER_HTML}
-'''
+        content = ref_links(sections[key], f'ch{ch}.html')
         # Strip the chapter-header div from content since we have the hero
-        ch_body = re.sub(
+        content = re.sub(
             r'\s*<div class="chapter-header">\s*'
             r'<div class="chapter-number">.*?</div>\s*'
             r'<h2>.*?</h2>\s*'
             r'<p class="chapter-sub">.*?</p>\s*'
             r'</div>',
             '',
-            ch_body,
+            content,
             count=1,
             flags=re.DOTALL
         )
         # Remove the wrapping <article> tags
-        ch_body = re.sub(r'<article[^>]*>', '', ch_body)
-        ch_body = ch_body.replace('</article>', '')
-
-        write_page(ROOT / f"ch{ch}.html",
-                   f"Chapter {ch}: {CHAPTER_TITLES[ch]} - Ari's Big Five",
-                   ch_body, f"ch{ch}.html")
+        content = re.sub(r'<article[^>]*>', '', content)
+        content = content.replace('</article>', '')
+
+        ch_body = load_template("chapter.html").render(
+            title=chapter.title,
+            word=chapter.word,
+            sub=chapter.sub,
+            content=content,
+            **chrome(ch),
+        )
+        yield f"ch{ch}.html", f"Chapter {ch}: {chapter.title} - {BOOK.title}", ch_body
 
     # 7. Conclusion + Further Reading
-    conclusion_content = fix_ref_links(sections['conclusion'])
-    conclusion_body = f'''
-<header class="hero">
-    <h1>Conclusion: The Diamond</h1>
-    <p class="subtitle">Five facets of one worldview</p>
-</header>
-
-<div class="chapter-content">
-{conclusion_content}
-
-<hr>
-
-<h2 id="further-reading">Further Reading</h2>
-<p>The chapters above draw on 43 source notes from the Nexus vault. Each contains Tim's original thinking, enriched with research and cross-references. They are the raw material from which this thesis was composed.</p>
-<p style="text-align: center; margin: 2rem 0;">
-    <a href="references/index.html" class="cta-button">Read the source notes &rarr;</a>
-</p>
-</div>
-
-{build_page_nav(6, NAV_ITEMS)}
-{FOOTER_HTML}
-'''
+    if not wanted("conclusion.html"):
+        return
+    conclusion_content = ref_links(sections['conclusion'], 'conclusion.html')
     # Remove wrapping tags
-    conclusion_body = re.sub(r'<section[^>]*>', '', conclusion_body)
-    conclusion_body = conclusion_body.replace('</section>', '')
-
-    write_page(ROOT / "conclusion.html",
-               "Conclusion - Ari's Big Five",
-               conclusion_body, "conclusion.html")
+    conclusion_content = re.sub(r'<section[^>]*>', '', conclusion_content)
+    conclusion_content = conclusion_content.replace('</section>', '')
 
+    conclusion_body = load_template("conclusion.html").render(
+        content=conclusion_content,
+        note_count=len(load_manifest().notes),
+        **chrome(len(nav_items()) - 1),
+    )
+    yield "conclusion.html", f"Conclusion - {BOOK.title}", conclusion_body
+
+
+def build_main_pages(sections, pages=None):
+    """Write the 7 main pages, or just the hrefs in pages if given."""
+    order = {href: idx for idx, (href, _, _) in enumerate(nav_items())}
+    for href, title, body in main_page_bodies(sections, pages):
+        write_page(SITE / href, title, body, href,
+                   prefetch=main_page_prefetch(order[href]))
+
+
+def write_page(path, title, body, active_href, is_subdir=False, desc="",
+               prefetch=()):
+    digest = hashlib.sha256()
+    with open_output(path) as fh:
+        for chunk in page_template(title, body, active_href, is_subdir, desc, prefetch):
+            fh.write(chunk)
+            digest.update(chunk)
+    rel = path.relative_to(SITE).as_posix()
+    WRITTEN_PAGES[rel] = digest.hexdigest()[:16]
+    record(f"page:{rel}", WRITTEN_PAGES[rel])
+    print(f"  wrote {rel}")
+
+
+def resume_page(rel):
+    """True if the interrupted build being resumed already wrote page rel."""
+    digest = completed(f"page:{rel}")
+    if digest is None or not (SITE / rel).exists():
+        return False
+    WRITTEN_PAGES[rel] = digest
+    return True
+
+
+# ── Offline service worker ───────────────────────────────────────────
+# Pages written this run: {"ch1.html": "<content hash>", ...}
+WRITTEN_PAGES = {}
+
+def write_service_worker():
+    """Write precache-manifest.json and sw.js from the pages built this run.
+
+    Entries for pages not rebuilt this run are carried over from the previous
+    manifest, so a partial build doesn't drop them. The reference index's
+    JSON chunks, if any, are precached too, as 'data' rather than pages so
+    they stay out of the sitemap. Nothing is written when the manifest is
+    unchanged, so clients don't re-install the worker.
+    Returns the previous and the new {url: content hash} of every page.
+    """
+    previous = {}
+    if PRECACHE_MANIFEST.exists():
+        previous = json.loads(PRECACHE_MANIFEST.read_text(encoding='utf-8'))
+    pages = {url: h for url, h in previous.get('pages', {}).items()
+             if (SITE / url).exists()}
+    pages.update(WRITTEN_PAGES)
+    pages = dict(sorted(pages.items()))
+    data = {path.relative_to(SITE).as_posix():
+            hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+            for path in sorted((REF_DIR / INDEX_CHUNK_DIR).glob("*.json"))}
+
+    version = hashlib.sha256(json.dumps([pages, data] if data else pages)
+                             .encode('utf-8')).hexdigest()[:16]
+    worker = load_template("sw.js").render(version=version).encode('utf-8')
+    # A new worker template must reach clients even if no file changed
+    if (previous.get('version') == version and SW_JS.exists()
+            and SW_JS.read_bytes() == worker):
+        print("  precache manifest unchanged")
+        keep_output(PRECACHE_MANIFEST)
+        keep_output(SW_JS)
+        return previous['pages'], pages
+
+    manifest = {'version': version, 'pages': pages}
+    if data:
+        manifest['data'] = data
+    write_output(PRECACHE_MANIFEST,
+                 (json.dumps(manifest, indent=1) + '\n').encode('utf-8'))
+    write_output(SW_JS, worker)
+    print(f"  wrote {SW_JS.name} + {PRECACHE_MANIFEST.name} ({len(pages)} pages)")
+    return previous.get('pages', {}), pages
+
+
+# ── Sitemap and feed ─────────────────────────────────────────────────
+def write_if_changed(path, text):
+    """Write text to path unless it already holds exactly that; True if written."""
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        keep_output(path)
+        return False
+    write_output(path, text.encode('utf-8'))
+    return True
+
+
+def write_sitemap(pages, previous):
+    """Write sitemap.xml for pages ({url: content hash}).
+
+    A page keeps its lastmod from the previous sitemap while its hash matches
+    the one in the previous precache manifest; new and changed pages get
+    today's date.
+    """
+    old = {}
+    if SITEMAP.exists():
+        old = dict(re.findall(r'<loc>(.*?)</loc>\s*<lastmod>(.*?)</lastmod>',
+                              SITEMAP.read_text(encoding='utf-8')))
+    today = time.strftime('%Y-%m-%d', time.gmtime())
+    entries, changed = [], 0
+    for url, digest in pages.items():
+        loc = SITE_URL + url
+        lastmod = old.get(loc) if previous.get(url) == digest else None
+        if lastmod is None:
+            lastmod, changed = today, changed + 1
+        entries.append(f'  <url>\n    <loc>{loc}</loc>\n'
+                       f'    <lastmod>{lastmod}</lastmod>\n  </url>\n')
+
+    sitemap = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+               + ''.join(entries) + '</urlset>\n')
+    if write_if_changed(SITEMAP, sitemap):
+        print(f"  wrote {SITEMAP.name} ({len(pages)} pages, {changed} changed)")
+    else:
+        print(f"  {SITEMAP.name} unchanged")
 
-def write_page(path, title, body, active_href, is_subdir=False, desc=""):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    html = page_template(title, body, active_href, is_subdir, desc)
-    html = normalize_dashes(html)
-    path.write_text(html, encoding='utf-8')
-    print(f"  wrote {path.relative_to(ROOT)}")
 
+RELATIVE_HREF = re.compile(r"""href=(['"])(?![a-z]+:|/)""")
 
-# ── Build reference pages ────────────────────────────────────────────
-def strip_version_notes(content):
-    content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-    content = re.sub(r'^up::.*$', '', content, flags=re.MULTILINE)
-    content = content.lstrip('\n')
-    content = re.sub(r'\n{3,}', '\n\n', content)
-    return content.strip()
 
+# Most recent updates in the feed
+FEED_ENTRIES = 20
 
-def remove_see_also(html):
-    """Remove 'See also:' paragraphs."""
-    return re.sub(r'<p>See also:.*?</p>', '', html, flags=re.DOTALL)
 
+def write_feed():
+    """Write feed.xml, an Atom feed of the latest updates in the book's log.
 
-def normalize_dashes(html):
-    """Replace em-dashes and double hyphens with single hyphens in content.
-
-    Preserves CSS custom properties (--var-name) and HTML comments.
-    Tim uses single hyphens consistently.
-    """
-    # Replace &mdash; entity
-    html = html.replace('&mdash;', '-')
-    # Replace literal em-dash character
-    html = html.replace('\u2014', '-')
-    # Replace en-dash character
-    html = html.replace('\u2013', '-')
-    # Replace double hyphens in content, but NOT in CSS (-- as custom properties)
-    # or HTML comments. We do this by splitting on <style> blocks and only
-    # replacing in non-style content.
-    parts = re.split(r'(<style>.*?</style>|<!--.*?-->)', html, flags=re.DOTALL)
-    for i, part in enumerate(parts):
-        if not part.startswith('<style>') and not part.startswith('<!--'):
-            # Replace " -- " with " - " (spaced double-hyphen)
-            parts[i] = part.replace(' -- ', ' - ')
-            # Replace remaining double-hyphens not in CSS context
-            parts[i] = re.sub(r'(?<!-)--(?![->\w])', '-', parts[i])
-    return ''.join(parts)
-
-
-def fix_poem_line_breaks(html):
-    """Convert soft newlines inside <p> blocks to <br> for poem formatting.
-
-    Targets paragraphs where every line ends with a rhyming/poetic pattern
-    (lines within a single <p> separated only by newlines). This handles the
-    Good Timber poem and any similar poetry in reference notes.
+    Each entry links to the update on its archive page and to the reference
+    notes its items link to.
     """
-    def add_breaks(m):
-        content = m.group(1)
-        # Only apply to blocks with 4+ lines (likely a poem stanza)
-        lines = content.strip().split('\n')
-        if len(lines) >= 4:
-            return '<p>' + '<br>\n'.join(lines) + '</p>'
-        return m.group(0)
-    return re.sub(r'<p>((?:[^\n<]+\n){3,}[^\n<]+)</p>', add_breaks, html)
-
-
-def remove_context_and_duplicate_heading(html, note_name):
-    """Remove <context>...</context> paragraphs and duplicate h1 heading."""
-    # Remove <p>&lt;context&gt;...&lt;/context&gt;</p>
-    html = re.sub(r'<p>&lt;context&gt;.*?&lt;/context&gt;</p>\s*', '', html, flags=re.DOTALL)
-    # Remove the first <h1> - it always duplicates the note title which is
-    # already shown as the page <h2>. We remove any first <h1> since the
-    # template provides the title. Handles case/punctuation/apostrophe variants.
-    html = re.sub(r'<h1>[^<]+</h1>\s*', '', html, count=1)
-    return html
-
-
-def convert_wikilinks_to_ref_links(html):
-    """Convert [[wikilinks]] to reference page links."""
-    def replace_wl(m):
-        name = m.group(1)
-        slug = slugify(name)
-        return f'<a href="{slug}.html" class="ref">{name}</a>'
-    return re.sub(r'\[\[([^\]]+)\]\]', replace_wl, html)
-
-
-# Set of valid reference slugs (pages that actually exist)
-VALID_REF_SLUGS = {slugify(name) for name in REFERENCED_FILES}
-
-
-def remove_broken_ref_links(html):
-    """Replace ref links to non-existent pages with plain text spans."""
-    def replace_if_broken(m):
-        href = m.group(1)
-        text = m.group(2)
-        slug = href.replace('.html', '')
-        if slug in VALID_REF_SLUGS:
-            return m.group(0)  # keep valid links
-        return text  # replace with plain text (no tag at all)
-    return re.sub(r'<a href="([^"]+\.html)" class="ref">([^<]+)</a>', replace_if_broken, html)
-
-
-def build_reference_pages():
-    """Generate individual reference pages and the references index."""
-    REF_DIR.mkdir(parents=True, exist_ok=True)
-    md = mistune.create_markdown()
-
-    toc_by_chapter = {}
-    for ch in range(1, 6):
-        toc_by_chapter[ch] = []
-
-    for name in REFERENCED_FILES:
-        slug = slugify(name)
-        chapter = CHAPTER_MAP.get(name, 0)
-
-        # Find and read vault file
-        candidates = list(VAULT_DIR.glob(f"{name}.md"))
-        if not candidates:
-            print(f"  WARNING: {name}.md not found, skipping")
-            continue
+    from html import escape
+
+    def absolute(m):
+        return f'href={m.group(1)}{SITE_URL}references/'
+
+    manifest = load_manifest()
+    updates = load_updates()
+    updates_url = f"{SITE_URL}references/updates.html"
+    entries = []
+    for index in reversed(range(max(len(updates) - FEED_ENTRIES, 0), len(updates))):
+        date, title, items = updates[index]
+        entry_url = (f"{SITE_URL}references/{update_page_of(index)}"
+                     f"#{update_anchor(date, title)}")
+        related = []
+        for item in items:
+            for slug in re.findall(r"""href=['"]([^'"/]+)\.html['"]""", item):
+                note = manifest.by_slug.get(slug)
+                if note and note not in related:
+                    related.append(note)
+        links = ''.join(f'\n    <link rel="related" href="{SITE_URL}references/{note.slug}.html"'
+                        f' title="{escape(note.name)}"/>' for note in related)
+        # Item links are relative to references/
+        content = '<ul>' + ''.join(
+            f'<li>{RELATIVE_HREF.sub(absolute, item)}</li>' for item in items) + '</ul>'
+        entries.append(f'''  <entry>
+    <id>tag:{FEED_TAG},{date}:updates/{slugify(title)}</id>
+    <title>{escape(title)}</title>
+    <updated>{date}T00:00:00Z</updated>
+    <link rel="alternate" type="text/html" href="{entry_url}"/>{links}
+    <content type="html">{escape(content)}</content>
+  </entry>
+''')
+
+    updated = last_updated()
+    feed = f'''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <id>{SITE_URL}</id>
+  <title>{escape(BOOK.title, quote=False)} - Updates</title>
+  <link rel="self" href="{SITE_URL}{FEED.name}"/>
+  <link rel="alternate" type="text/html" href="{updates_url}"/>
+  <author><name>{escape(BOOK.author or BOOK.title, quote=False)}</name></author>
+  <updated>{updated}T00:00:00Z</updated>
+{''.join(entries)}</feed>
+'''
+    if write_if_changed(FEED, feed):
+        print(f"  wrote {FEED.name} ({len(entries)} updates)")
+    else:
+        print(f"  {FEED.name} unchanged")
 
-        raw = candidates[0].read_text(encoding='utf-8')
-        cleaned = strip_version_notes(raw)
-        html_content = md(cleaned)
-        html_content = convert_wikilinks_to_ref_links(html_content)
-        html_content = remove_broken_ref_links(html_content)
-        html_content = remove_see_also(html_content)
-        html_content = remove_context_and_duplicate_heading(html_content, name)
-        html_content = fix_poem_line_breaks(html_content)
-        html_content = fix_ref_links_from_subdir(html_content)
 
-        # Determine which chapter page links back
-        ch_page = f"ch{chapter}.html"
-        ch_title = CHAPTER_TITLES.get(chapter, "")
+# ── Build reference pages ────────────────────────────────────────────
+# From this many notes on, references/index.html no longer lists every note
+# as an <li>: each chapter's list is written as compact JSON chunks under
+# references/notes/, and the page renders only the rows in view, fetching
+# chunks as they scroll in (templates/ref_index.js).
+VIRTUAL_INDEX_NOTES = 1000
+INDEX_CHUNK = 200  # notes per chunk
+INDEX_CHUNK_DIR = "notes"  # under references/
+
+VIRTUAL_INDEX_CSS = '''
+<style>
+.ref-virtual { position: relative; }
+.ref-virtual li { position: absolute; left: 0; right: 0; height: 30px; margin: 0;
+                  white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+</style>
+'''
 
-        body = f'''
-<div class="back-link-bar">
-    <a href="../{ch_page}">&larr; Back to Chapter {chapter}: {ch_title}</a>
-</div>
 
-<div class="note-content">
-    <h2>{name}</h2>
-    {html_content}
-</div>
+def index_chunk_groups(groups):
+    """Write the chunks of a virtualized index; return its list markup.
 
-<div class="page-nav" style="max-width:720px;margin:2rem auto;padding:0 1.5rem;">
-    <a href="index.html" class="prev">All Source Notes</a>
-    <a href="../{ch_page}" class="next">Back to Chapter {chapter}</a>
-</div>
+    groups is (chapter, title, notes) for each chapter. Chunks no longer
+    needed are removed.
+    """
+    written = set()
+    parts = []
+    for ch, ch_title, items in groups:
+        for start in range(0, len(items), INDEX_CHUNK):
+            path = REF_DIR / INDEX_CHUNK_DIR / f"ch{ch}-{start // INDEX_CHUNK}.json"
+            rows = [[note.name, note.slug] for note in items[start:start + INDEX_CHUNK]]
+            write_if_changed(path, json.dumps(rows, ensure_ascii=False,
+                                              separators=(',', ':')))
+            written.add(path)
+        parts.append(f'''
+<div class="ref-chapter-group">
+    <div class="ref-chapter-label">Chapter {ch}: {ch_title} ({len(items)})</div>
+    <ul class="ref-list ref-virtual" data-count="{len(items)}" data-chunk="{INDEX_CHUNK}"
+        data-src="{INDEX_CHUNK_DIR}/ch{ch}-"></ul>
+</div>''')
+    prune_index_chunks(written)
+    print(f"  wrote {len(written)} index chunks")
+    parts.append('<noscript><p>This list needs JavaScript; '
+                 '<a href="../references.html">all notes on one page</a>.</p></noscript>')
+    parts.append(f'{VIRTUAL_INDEX_CSS}<script>\n{load_asset("ref_index.js")}</script>')
+    return parts
+
+
+def prune_index_chunks(keep=()):
+    """Remove index chunks on disk other than those in keep."""
+    chunk_dir = REF_DIR / INDEX_CHUNK_DIR
+    if dry_running() or not chunk_dir.exists():
+        return
+    for path in chunk_dir.glob("*.json"):
+        if path not in keep:
+            path.unlink()
+
+
+def build_reference_pages(vault, max_in_flight=READ_AHEAD, only=None, index=True):
+    """Generate individual reference pages and the references index.
+
+    Up to max_in_flight upcoming notes are read while the current one renders;
+    vault may be None if only is empty. If only is a set of note names, just
+    those pages are rebuilt; the index (skipped if index is False) still lists
+    every other note whose page already exists. Returns the RenderedNotes
+    built, for build_references.
+    """
+    listed = set()  # notes whose page goes in the index
+
+    manifest = load_manifest()
+    notes = manifest.notes
+    if only is not None:
+        listed = {name for name, slug, _ in notes
+                  if name not in only and (REF_DIR / f"{slug}.html").exists()}
+        notes = [note for note in notes if note.name in only]
+
+    # Notes an interrupted build already rendered and wrote pages for
+    resumed = []
+    for note in notes:
+        html_content = completed(f"note:{note.name}")
+        if html_content is not None and resume_page(f"references/{note.slug}.html"):
+            resumed.append(RenderedNote(*note, html_content))
+    if resumed:
+        print(f"  {len(resumed)} reference pages already built (resuming)")
+    done = {note.name for note in resumed}
+
+    # Each page is written, and checkpointed, as soon as its note renders
+    rendered = []
+    for note in render_notes(vault, [n for n in notes if n.name not in done],
+                             max_in_flight):
+        name, slug, chapter, html_content = note
+        # Determine which chapter page links back
+        ch_page = f"ch{chapter}.html"
+        ch_title = manifest.chapter_titles.get(chapter, "")
+
+        body = load_template("note.html").render(
+            ch_page=ch_page,
+            chapter=chapter,
+            ch_title=ch_title,
+            name=name,
+            content=html_content,
+            book_title=BOOK.title,
+        )
+        # Readers tend to go back to the chapter or on to its other key notes
+        prefetch = [f"../{ch_page}"]
+        prefetch += [f"{s}.html" for s in top_linked_refs(ch_page, exclude=slug)]
 
-<footer class="footer">
-    <p>From Tim's personal knowledge vault (TheNexus3.0).</p>
-    <p><a href="../index.html">&larr; Back to Ari's Big Five</a></p>
-</footer>
-'''
         write_page(
             REF_DIR / f"{slug}.html",
-            f"{name} - Ari's Big Five",
+            f"{name} - {BOOK.title}",
             body, None, is_subdir=True,
-            desc=f"Source note: {name}"
+            desc=f"Source note: {name}",
+            prefetch=prefetch
         )
+        record(f"note:{name}", html_content)
+        rendered.append(note)
 
-        toc_by_chapter[chapter].append((name, slug))
+    order = {name: i for i, name in enumerate(manifest.names)}
+    rendered = sorted(rendered + resumed, key=lambda note: order[note.name])
+    listed.update(note.name for note in rendered)
+
+    if not index:
+        return rendered
 
     # Build references index page
-    toc_html_parts = []
-    for ch in range(1, 6):
-        ch_title = CHAPTER_TITLES[ch]
-        items = toc_by_chapter.get(ch, [])
-        toc_html_parts.append(f'''
+    groups = [(ch, ch_title, [note for note in manifest.by_chapter[ch]
+                              if note.name in listed])
+              for ch, ch_title in manifest.chapter_titles.items()]
+    if len(listed) >= VIRTUAL_INDEX_NOTES:
+        toc_html_parts = index_chunk_groups(groups)
+    else:
+        prune_index_chunks()
+        toc_html_parts = []
+        for ch, ch_title, items in groups:
+            toc_html_parts.append(f'''
 <div class="ref-chapter-group">
     <div class="ref-chapter-label">Chapter {ch}: {ch_title}</div>
     <ul class="ref-list">''')
-        for name, slug in items:
-            toc_html_parts.append(f'        <li><a href="{slug}.html">{name}</a></li>')
-        toc_html_parts.append('    </ul>\n</div>')
+            for note in items:
+                toc_html_parts.append(
+                    f'        <li><a href="{note.slug}.html">{note.name}</a></li>')
+            toc_html_parts.append('    </ul>\n</div>')
+
+    count = len(manifest.notes)
+    index_body = load_template("references_index.html").render(
+        groups=toc_html_parts,
+        count=count,
+        book_title=BOOK.title,
+        updates_link=UPDATES_LINK if BOOK.updates else '',
+    )
+    write_page(
+        REF_DIR / "index.html",
+        f"Further Reading - {BOOK.title}",
+        index_body, None, is_subdir=True,
+        desc=f"{count} source notes from the Nexus vault referenced in {BOOK.title}."
+    )
+    return rendered
+
 
-    index_body = f'''
-<header class="hero">
-    <h1>Further Reading</h1>
-    <p class="subtitle">43 source notes from the Nexus vault</p>
-</header>
+# The HTML each note had when its page was last written, kept in the book's
+# build state: {name: html}, or {name: null} for a note a full build didn't
+# find in the vault. Pages built from every note (references.html, the EPUB)
+# take the notes a build didn't render from here, matching their pages.
+SAVED_RENDERS = "renders.json"
 
-<div class="back-link-bar" style="margin-top:1.5rem;">
-    <a href="../index.html">&larr; Back to Ari's Big Five</a>
-</div>
 
-<div class="ref-grid" style="margin-top:2rem;">
-{''.join(toc_html_parts)}
-</div>
+def saved_renders():
+    path = STATE / SAVED_RENDERS
+    return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
 
-<div style="text-align:center; margin: 2rem 0;">
+
+def save_renders(rendered, complete=False):
+    """Record the notes just rendered; complete if that was every note."""
+    if dry_running():
+        return
+    names = load_manifest().names
+    saved = dict.fromkeys(names) if complete else saved_renders()
+    saved.update((note.name, note.html) for note in rendered)
+    saved = {name: saved[name] for name in names if name in saved}
+    path = STATE / SAVED_RENDERS
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(saved, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+def every_render(rendered):
+    """The RenderedNotes of the whole book, in manifest order, taking notes
+    not in rendered from saved_renders(); None if some note never was."""
+    fresh = {note.name: note for note in rendered}
+    saved = saved_renders()
+    notes = []
+    for note in load_manifest().notes:
+        if note.name in fresh:
+            notes.append(fresh[note.name])
+        elif note.name not in saved:
+            return None
+        elif saved[note.name] is not None:
+            notes.append(RenderedNote(*note, saved[note.name]))
+    return notes
+
+
+# ── Updates pages ────────────────────────────────────────────────────
+# A book's changelog (Book.updates, e.g. updates.jsonl) has one JSON object per
+# line, oldest first; new updates are appended:
+# {"date": "YYYY-MM-DD", "title": ..., "items": ["<html>", ...]}
+# A book without one has no updates pages or feed.
+
+UPDATES_LINK = '''<div style="text-align:center; margin: 2rem 0;">
     <a href="updates.html" style="font-family: 'Helvetica Neue', Arial, sans-serif; font-size: 0.85rem; color: var(--accent); text-decoration: none; border-bottom: 1px solid var(--border); padding-bottom: 0.2rem;">View update history &rarr;</a>
-</div>
+</div>'''
 
-<footer class="footer">
-    <p>These notes are from Tim's personal knowledge vault (TheNexus3.0).
-    They represent years of collected wisdom, experience, and reflection.</p>
-    <p><a href="../index.html">&larr; Back to Ari's Big Five</a></p>
-</footer>
-'''
-    write_page(
-        REF_DIR / "index.html",
-        "Further Reading - Ari's Big Five",
-        index_body, None, is_subdir=True,
-        desc="43 source notes from the Nexus vault referenced in Ari's Big Five."
-    )
+# Updates per archive page. references/updates-<n>.html holds updates
+# (n-1)*UPDATES_PER_PAGE+1 onwards, counting from the oldest, so a page's URL
+# and content never change once it is full.
+UPDATES_PER_PAGE = 10
 
+# Key each updates page was last rendered with: {"updates-1.html": key, ...},
+# kept in the book's build state
+UPDATES_PAGES_CACHE = "updates-pages.json"
 
-# ── Updates page ─────────────────────────────────────────────────────
-UPDATES_LOG = [
-    ("2026-02-20", "The Neck Doesn't Look Back Either", [
-        "Expanded <strong>The Giant Is You</strong> concept with the backward-looking dimension of the neck problem - the neck doesn't just look up (comparison), it also fails to look back (amnesia about growth, lessons, and scars).",
-        "Added new section to <strong>Chapter 1: The Giant Within</strong> exploring three directions the neck fails: up (comparison that shrinks you), back (amnesia that robs confidence and gratitude), and around (blindness to who you can serve).",
-        "Connected the backward look to <a href='the-big-mountain.html' class='ref'>The big mountain</a> ('confidence comes from the past'), <a href='character-comes-from-imperfections.html' class='ref'>Character comes from imperfections</a> (gold in the cracks), <a href='temporal-love.html' class='ref'>Temporal Love</a> (love performed in time), and <a href='seasons-of-life.html' class='ref'>Seasons of Life</a> (seasons already lived).",
-        "Added temporal connection to <strong>Chapter 5: Love in Finite Time</strong> - the backward look as evidence of a life well-lived with family.",
-        "Updated conclusion diamond summary and observations to reflect the three-directional neck problem.",
-        "Updated <a href='the-giant-is-you.html' class='ref'>The Giant Is You</a> source note with new section and research on autobiographical reasoning.",
-    ]),
-    ("2026-02-18", "Initial publication", [
-        "Published Ari's Big Five - a thesis on the five most valuable ideas in the Nexus vault.",
-        "Five chapters covering identity, adversity, compounding, trust, and love in finite time.",
-        "43 source notes from the vault, each with original thinking enriched by research.",
-    ]),
-]
-
-
-def build_updates_page():
-    """Generate the updates changelog page."""
-    entries_html = []
-    for date, title, items in UPDATES_LOG:
-        items_html = '\n'.join(f'        <li>{item}</li>' for item in items)
-        entries_html.append(f'''
-<div class="ref-chapter-group">
+# Each book's parsed log: {path: (mtime, updates)}
+UPDATES_CACHE = {}
+
+
+def load_updates():
+    """(date, title, items) for every update of the book, oldest first."""
+    if BOOK.updates is None:
+        return []
+    key = BOOK.updates.stat().st_mtime_ns
+    cached = UPDATES_CACHE.get(BOOK.updates)
+    if cached is None or cached[0] != key:
+        with open(BOOK.updates, encoding='utf-8') as fh:
+            entries = [json.loads(line) for line in fh if line.strip()]
+        cached = UPDATES_CACHE[BOOK.updates] = (
+            key, [(e['date'], e['title'], e['items']) for e in entries])
+    return cached[1]
+
+
+def last_updated():
+    """The date (YYYY-MM-DD) the book last changed: its newest update, else
+    its newest page in the sitemap, else today, as for a new, empty log."""
+    dates = [date for date, _, _ in load_updates()]
+    if not dates and SITEMAP.exists():
+        dates = re.findall(r'<lastmod>(.*?)</lastmod>', SITEMAP.read_text(encoding='utf-8'))
+    return max(dates, default=time.strftime('%Y-%m-%d', time.gmtime()))
+
+
+def update_anchor(date, title):
+    return f"{date}-{slugify(title)}"
+
+
+def update_page_of(index):
+    """Archive page holding the update at index (0 = oldest)."""
+    return f"updates-{index // UPDATES_PER_PAGE + 1}.html"
+
+
+# Bump when the markup of render_update() or update_anchor() changes, so the
+# cached updates pages are rendered again
+UPDATE_MARKUP_VERSION = 1
+
+
+def render_update(date, title, items):
+    items_html = '\n'.join(f'        <li>{item}</li>' for item in items)
+    return f'''
+<div class="ref-chapter-group" id="{update_anchor(date, title)}">
     <div class="ref-chapter-label">{date}</div>
     <h3 style="margin-top: 0.5rem; margin-bottom: 0.75rem;">{title}</h3>
     <ul style="padding-left: 1.2rem; margin-bottom: 0;">
 {items_html}
     </ul>
-</div>''')
+</div>'''
 
-    body = f'''
-<header class="hero">
-    <h1>Updates</h1>
-    <p class="subtitle">Changes and additions to Ari's Big Five</p>
-</header>
 
-<div class="back-link-bar" style="margin-top:1.5rem;">
-    <a href="index.html">&larr; Back to Further Reading</a>
-</div>
+def build_updates_pages():
+    """Generate the paginated changelog: archive pages and the updates index.
 
-<div class="ref-grid" style="margin-top:2rem;">
-{''.join(entries_html)}
-</div>
+    references/updates.html shows the latest UPDATES_PER_PAGE updates and
+    links to every archive page. A page is only rendered again when its
+    updates, the page shell, the template or UPDATE_MARKUP_VERSION changed,
+    so appending an update re-renders just the newest archive page and the
+    index, however long the log grows.
+    """
+    updates = load_updates()
+    chunks = [updates[i:i + UPDATES_PER_PAGE]
+              for i in range(0, len(updates), UPDATES_PER_PAGE)]
+    template = load_template("updates.html")
+    # Anything shared by every page: the shell, stylesheet, sidebar, template
+    shell_key = hashlib.sha256(
+        b''.join(page_shell(None, True)[1]) + ''.join(template.literals).encode('utf-8')
+    ).hexdigest()
+
+    cache_file = STATE / UPDATES_PAGES_CACHE
+    cache = {}
+    if cache_file.exists():
+        cache = json.loads(cache_file.read_text(encoding='utf-8'))
+    unchanged = 0
+
+    def build(name, title, subtitle, entries, pager):
+        nonlocal unchanged
+        desc = f"Update history for {BOOK.title}."
+        key = hashlib.sha256(json.dumps(
+            [shell_key, UPDATE_MARKUP_VERSION, BOOK.title, title, desc, subtitle,
+             entries, pager]).encode('utf-8')).hexdigest()[:16]
+        if cache.get(name) == key and (REF_DIR / name).exists():
+            keep_output(REF_DIR / name)
+            unchanged += 1
+            return
+        body = template.render(
+            subtitle=subtitle,
+            entries=[render_update(*entry) for entry in reversed(entries)],
+            pager=pager,
+            book_title=BOOK.title,
+        )
+        write_page(REF_DIR / name, title, body, None, is_subdir=True, desc=desc)
+        cache[name] = key
 
-<footer class="footer">
-    <p><a href="../index.html">&larr; Back to Ari's Big Five</a></p>
-</footer>
-'''
-    write_page(
-        REF_DIR / "updates.html",
-        "Updates - Ari's Big Five",
-        body, None, is_subdir=True,
-        desc="Update history for Ari's Big Five."
-    )
+    for n, entries in enumerate(chunks, 1):
+        older = f'<a href="updates-{n - 1}.html">&larr; Older updates</a> &middot; ' if n > 1 else ''
+        build(f"updates-{n}.html", f"Updates, page {n} - {BOOK.title}",
+              f"{entries[0][0]} to {entries[-1][0]}", entries,
+              f'<p>{older}<a href="updates.html">Latest updates</a></p>')
+
+    archive = ' &middot; '.join(
+        f'<a href="updates-{n}.html">{entries[0][0]} to {entries[-1][0]}</a>'
+        for n, entries in reversed(list(enumerate(chunks, 1))))
+    build("updates.html", f"Updates - {BOOK.title}",
+          f"Changes and additions to {BOOK.title}", updates[-UPDATES_PER_PAGE:],
+          f'<p>All updates: {archive}</p>' if archive else '')
+
+    if not dry_running():
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps(cache, indent=1) + '\n', encoding='utf-8')
+    if unchanged:
+        print(f"  {unchanged} of {len(chunks) + 1} updates pages unchanged")
 
 
 # ── Main ─────────────────────────────────────────────────────────────
-def main():
-    # Read the original single-page HTML
+# Sections of each book's source HTML: {path: ((mtime, manifest), sections)},
+# so a long-running build only re-parses index_source.html after it changes
+SECTIONS_CACHE = {}
+
+
+def load_sections(source):
+    """The sections of a book's source HTML, kept until the file changes."""
+    key = (source.stat().st_mtime_ns, load_manifest())
+    cached = SECTIONS_CACHE.get(source)
+    if cached is None or cached[0] != key:
+        cached = SECTIONS_CACHE[source] = (
+            key, extract_sections(source.read_text(encoding='utf-8')))
+    return cached[1]
+
+
+def source_html():
+    """The original single-page HTML the main pages are extracted from."""
+    if BOOK.name != DEFAULT_BOOK.name:
+        return SRC_HTML
     # First time: rename index.html to index_source.html as backup
     original = ROOT / "index.html"
-    if not SRC_HTML.exists() and original.exists():
+    if not SRC_HTML.exists() and original.exists() and not dry_running():
         shutil.copy2(original, SRC_HTML)
         print(f"Backed up original to {SRC_HTML.name}")
+    return SRC_HTML if SRC_HTML.exists() else original
 
-    source = SRC_HTML if SRC_HTML.exists() else original
-    html = source.read_text(encoding='utf-8')
-
-    print("Extracting sections...")
-    sections = extract_sections(html)
-
-    print("\nBuilding main pages...")
-    build_main_pages(sections)
 
-    print("\nBuilding reference pages...")
-    build_reference_pages()
+def run_key(args):
+    """Identify a build by its arguments and when its inputs last changed."""
+    inputs = [BOOK.manifest, SRC_HTML, *filter(None, [BOOK.updates]),
+              *sorted(TEMPLATE_DIR.iterdir())]
+    state = [BOOK.name, str(args.vault), args.only, args.since,
+             [(p.name, p.stat().st_mtime_ns) for p in inputs if p.exists()]]
+    return hashlib.sha256(json.dumps(state).encode('utf-8')).hexdigest()[:16]
 
-    print("\nBuilding updates page...")
-    build_updates_page()
 
-    print(f"\nDone! Generated 7 main pages + 44 reference pages + updates page.")
+def parse_targets(specs):
+    """Turn --only specs into a build plan.
 
+    Targets: index, ch1..ch5, conclusion (main pages); refs (every reference
+    page and the references index); refs:<note> (one reference page, by slug
+    or name); refs:index (the references index); updates (the updates pages);
+    epub (the EPUB export, see epub.py).
+    """
+    plan = {'main': set(), 'notes': set(), 'ref_index': False, 'updates': False,
+            'epub': False}
+    main_pages = {href.removesuffix('.html'): href for href, _, _ in nav_items()}
+    main_pages['intro'] = main_pages['index']
+    manifest = load_manifest()
+    for spec in specs:
+        for target in filter(None, spec.split(',')):
+            if target in main_pages:
+                plan['main'].add(main_pages[target])
+            elif target == 'refs':
+                plan['notes'].update(manifest.names)
+                plan['ref_index'] = True
+            elif target == 'refs:index':
+                plan['ref_index'] = True
+            elif target.startswith('refs:'):
+                note = manifest.resolve(target[len('refs:'):])
+                if note is None:
+                    raise SystemExit(f"Unknown note in --only {target}")
+                plan['notes'].add(note.name)
+            elif target == 'updates':
+                plan['updates'] = True
+            elif target == 'epub':
+                plan['epub'] = True
+            else:
+                raise SystemExit(f"Unknown --only target: {target}")
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Ari's Big Five site.")
+    parser.add_argument('--vault', type=Path,
+                        help="vault folder or vault.pack to read notes from")
+    parser.add_argument('--read-ahead', type=int, default=READ_AHEAD, metavar='N',
+                        help=f"notes to read concurrently (default {READ_AHEAD})")
+    parser.add_argument('--since', metavar='REV',
+                        help="only rebuild notes changed in the vault's git repo since REV")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="build in memory and report which files would be added, "
+                             "changed or orphaned, without writing anything; "
+                             "exits 1 if any would")
+    parser.add_argument('--diff', action='store_true',
+                        help="with --dry-run, show changed files as unified diffs")
+    parser.add_argument('--strict-budget', action='store_true',
+                        help="fail if a page or the site is over its size budget "
+                             "(see page_weight.py)")
+    parser.add_argument('--preview', metavar='NAME',
+                        help="also snapshot the site as preview NAME, e.g. a branch "
+                             "(see blobs.py)")
+    parser.add_argument('--only', action='append', metavar='TARGET',
+                        help="build just these targets (repeatable or comma-separated): "
+                             "index, ch1..ch5, conclusion, refs, refs:<note>, "
+                             "refs:index, updates, epub")
+    parser.add_argument('--books', type=Path, metavar='FILE',
+                        help="build each book listed in FILE in turn (see load_books)")
+    args = parser.parse_args(argv)
+    if args.preview and args.dry_run:
+        parser.error("--preview can't be combined with --dry-run")
+
+    books = load_books(args.books) if args.books else [DEFAULT_BOOK]
+    differs, over_budget = False, []
+    try:
+        for book in books:
+            if book != BOOK:
+                use_book(book)
+                nav_items.cache_clear()
+                page_shell.cache_clear()
+            if len(books) > 1:
+                print(f"\n=== {book.name} ===")
+            # Other books' sources, and their sites if inside this one's
+            exclude = [other.source for other in books]
+            exclude += [other.out for other in books if SITE in other.out.parents]
+            book_differs, book_over = build_book(args, exclude)
+            differs |= book_differs
+            over_budget += [f"{book.name}: {message}" if len(books) > 1 else message
+                            for message in book_over]
+    finally:
+        if BOOK != DEFAULT_BOOK:  # a long-running build starts from it next time
+            use_book(DEFAULT_BOOK)
+            nav_items.cache_clear()
+            page_shell.cache_clear()
+
+    if differs:
+        raise SystemExit(1)
+    if over_budget and args.strict_budget:
+        raise SystemExit(f"Over budget: {'; '.join(over_budget)}")
+
+
+def build_book(args, exclude=()):
+    """Build the book in use (see use_book) as main()'s args say.
+
+    exclude are files and directories under the book's output directory that
+    aren't part of its site (see check_links.site_pages). Returns whether a
+    dry run found changes, and the size budget overruns.
+    """
+    # Per-run state; everything else cached at module level is kept warm
+    WRITTEN_PAGES.clear()
+    REF_LINK_COUNTS.clear()
+    set_dry_run(args.dry_run)
+    OBSERVERS.clear()
+    validator = validate_html.Validator(SITE)
+    OBSERVERS.append(validator)
+    # However the build ends, stop the validator's thread
+    try:
+        other_pages = write_book(args)
+    finally:
+        OBSERVERS.remove(validator)
+        errors = validator.finish()
+
+    print("\nValidating HTML...")
+    validate_html.report(errors, validator.pages)
+
+    import check_links
+    complete = not args.only and not args.since
+    if args.dry_run:
+        # Only a complete build can tell which pages on disk are orphaned
+        owned = ({SITE / page for page in check_links.site_pages(SITE, exclude)}
+                 if complete else ())
+        print("\nComparing with the files on disk...")
+        return report_dry_run(SITE, owned, args.diff), []
+
+    print("\nMeasuring page weight...")
+    import page_weight
+    over_budget = page_weight.record_build([*WRITTEN_PAGES, *other_pages], SITE,
+                                           STATE / page_weight.HISTORY.name)
+
+    print("\nChecking links...")
+    # A partial build only answers for the links on the pages it wrote
+    checked = None if complete else [*WRITTEN_PAGES, *other_pages]
+    check_links.report(*check_links.check_site(SITE, exclude=exclude, pages=checked))
+
+    if args.preview:
+        print("\nSnapshotting preview...")
+        import blobs
+        name = args.preview
+        if BOOK.name != DEFAULT_BOOK.name:
+            name += f"-{BOOK.name}"
+        blobs.snapshot(name, SITE, exclude)
+
+    print(f"\nDone! Wrote {len(WRITTEN_PAGES)} pages.")
+    return False, over_budget
+
+
+def write_book(args):
+    """Write the outputs main()'s args ask for; return the pages written
+    outside write_page()."""
+    if args.only:
+        plan = parse_targets(args.only)
+    else:
+        plan = {'main': None, 'notes': None, 'ref_index': True, 'updates': True,
+                'epub': False}
+    if args.since:
+        vault = open_vault(args.vault)
+        changed = changed_notes(vault, args.since)
+        print(f"{len(changed)} note(s) changed since {args.since}")
+        plan = {'main': set(), 'notes': changed, 'ref_index': True, 'updates': False,
+                'epub': False}
+
+    all_rendered = None  # every note, when this run renders them all
+    other_pages = []     # pages written outside write_page()
+    journal = STATE / JOURNAL.name
+    if not args.dry_run:
+        open_journal(run_key(args), journal)
+
+    if plan['main'] is None or plan['main']:
+        hrefs = [href for href, _, _ in nav_items()
+                 if plan['main'] is None or href in plan['main']]
+        todo = {href for href in hrefs if not resume_page(href)}
+        if len(todo) < len(hrefs):
+            print(f"{len(hrefs) - len(todo)} main pages already built (resuming)")
+        if todo:
+            print("Extracting sections...")
+            sections = load_sections(source_html())
+
+            print("\nBuilding main pages...")
+            build_main_pages(sections, todo)
+
+    if plan['notes'] is None or plan['notes'] or plan['ref_index']:
+        print("\nBuilding reference pages...")
+        # Just the index needs no notes read, so no vault
+        vault = open_vault(args.vault) if plan['notes'] is None or plan['notes'] else None
+        rendered = build_reference_pages(vault, args.read_ahead,
+                                         only=plan['notes'], index=plan['ref_index'])
+        complete = plan['notes'] is None or plan['notes'] == set(load_manifest().names)
+        save_renders(rendered, complete)
+        if complete or plan['notes']:
+            # references.html holds every note, so keep it in step with their pages
+            notes = rendered if complete else every_render(rendered)
+            if notes is None:
+                print(f"  WARNING: {build_references.OUT.name} is stale: some notes "
+                      f"have not been rendered yet; run a full build")
+            else:
+                build_references.write_references_html(
+                    notes, SITE / build_references.OUT.name, BOOK.title)
+                all_rendered = notes
+                other_pages.append(build_references.OUT.name)
+
+    if plan['updates'] and BOOK.updates:
+        print("\nBuilding updates pages...")
+        build_updates_pages()
+
+    if plan['epub']:
+        print("\nExporting EPUB...")
+        import epub
+        if all_rendered is None:
+            # The notes as their pages were last written, else read them afresh
+            all_rendered = every_render(())
+        if all_rendered is None:
+            all_rendered = list(render_notes(open_vault(args.vault),
+                                             load_manifest().notes, args.read_ahead))
+            save_renders(all_rendered, complete=True)
+        titles = {href: title for href, title, _ in nav_items()}
+        pages = ((href, titles[href], body) for href, _, body
+                 in main_page_bodies(load_sections(source_html()), site=False))
+        # The default book keeps the identifier its exports always had
+        url = epub.BOOK_URL if BOOK.name == DEFAULT_BOOK.name else BOOK.url
+        epub.export_epub(pages, all_rendered, last_updated(),
+                         SITE / f"{BOOK.name}.epub", BOOK.title, url,
+                         BOOK.author or BOOK.title)
+
+    print("\nWriting service worker...")
+    previous_pages, pages = write_service_worker()
+
+    print("\nWriting sitemap and feed...")
+    write_sitemap(pages, previous_pages)
+    if BOOK.updates:
+        write_feed()
+    close_journal(finished=not args.dry_run, path=journal)
+    return other_pages
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,145 @@
+"""
+Check every link in the built site: pages, ref links, the sidebar, updates.
+
+Indexes each output page's path and the ids it defines in one pass (pages are
+read and scanned on a thread pool), then checks every relative href and src
+against that index, in memory. Reports broken links and anchors per page.
+build_site.py runs it after every build; after a partial one (--only,
+--since) just on the pages it wrote, reading the rest only for the anchors
+their links point at.
+
+Usage:
+  python check_links.py        # exits 1 if anything is broken
+"""
+
+import os, posixpath, re, sys
+from pathlib import Path
+from urllib.parse import unquote
+
+ROOT = Path(__file__).parent
+
+# Not part of the published site
+SKIP_DIRS = {'templates', '__pycache__'}
+SKIP_FILES = {'index_source.html'}
+
+# Every start tag, quoted values and all, so that a stray '="' in text isn't
+# taken for an attribute. Within each, every quoted attribute value: matching
+# from the "=" is several times faster than spelling out the attribute names,
+# which are checked separately.
+TAG = re.compile(r'''<[a-zA-Z](?:[^>"']+|"[^"]*"|'[^']*')*>''')
+ATTR_VALUE = re.compile(r'''=(["'])(.*?)\1''', re.DOTALL)
+ATTRS = ('href', 'src', 'id', 'name')
+EXTERNAL = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//)', re.IGNORECASE)
+
+
+def site_pages(root=ROOT, exclude=()):
+    """Paths of the published HTML pages, relative to root, in posix form.
+
+    exclude holds files and directories to leave out, e.g. another site
+    built inside this one.
+    """
+    exclude = {Path(path) for path in exclude}
+    pages = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')
+                       and Path(dirpath, d) not in exclude]
+        rel_dir = Path(dirpath).relative_to(root).as_posix()
+        pages += [posixpath.normpath(posixpath.join(rel_dir, f)) for f in filenames
+                  if f.endswith('.html') and f not in SKIP_FILES
+                  and Path(dirpath, f) not in exclude]
+    return sorted(pages)
+
+
+def attr_name(html, pos):
+    """The attribute in ATTRS whose "=" is at pos, or None."""
+    for attr in ATTRS:
+        start = pos - len(attr)
+        if html.startswith(attr, start) and html[start - 1].isspace():
+            return attr
+    return None
+
+
+def scan(root, page):
+    """(ids, links) of one page; links are (line, url) pairs."""
+    html = (root / page).read_text(encoding='utf-8')
+    ids, links = set(), []
+    line, pos = 1, 0
+    for tag in TAG.finditer(html):
+        for m in ATTR_VALUE.finditer(html, tag.start(), tag.end()):
+            attr = attr_name(html, m.start())
+            if attr is None:
+                continue
+            value = m.group(2)
+            if attr in ('id', 'name'):
+                ids.add(value)
+            else:
+                line += html.count('\n', pos, m.start())
+                pos = m.start()
+                links.append((line, value))
+    return ids, links
+
+
+def resolve(page, url):
+    """(target page, fragment) of a relative link on page; None if external."""
+    if not url or EXTERNAL.match(url):
+        return None
+    path, _, fragment = url.partition('#')
+    path = unquote(path.split('?')[0])
+    if not path:
+        return page, unquote(fragment)
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(page), path))
+    if path.endswith('/'):
+        target = posixpath.join(target, 'index.html')
+    return target, unquote(fragment)
+
+
+def check_site(root=ROOT, max_workers=8, exclude=(), pages=None):
+    """Return ({page: [(line, url, problem), ...]}, pages checked) for the site.
+
+    pages limits the check to the links on those pages; other pages are only
+    scanned for the ids their links point at.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    site = set(site_pages(root, exclude))
+    pages = sorted(site if pages is None else site.intersection(pages))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        index = dict(zip(pages, pool.map(lambda page: scan(root, page), pages)))
+        links = {page: [(line, url, resolve(page, url)) for line, url in index[page][1]]
+                 for page in pages}
+        targets = sorted({link[0] for page_links in links.values()
+                          for _, _, link in page_links
+                          if link and link[1] and link[0] in site} - index.keys())
+        index.update(zip(targets, pool.map(lambda page: scan(root, page), targets)))
+
+    broken = {}
+    for page in pages:
+        for line, url, link in links[page]:
+            if link is None:
+                continue
+            target, fragment = link
+            if target not in index:
+                if not (root / target).is_file():
+                    broken.setdefault(page, []).append((line, url, "no such page"))
+            elif fragment and fragment not in index[target][0]:
+                broken.setdefault(page, []).append((line, url, "no such anchor"))
+    return broken, len(pages)
+
+
+def report(broken, page_count):
+    """Print broken links per page; return how many there are."""
+    total = sum(len(links) for links in broken.values())
+    for page, links in broken.items():
+        print(f"  {page}:")
+        for line, url, problem in links:
+            print(f"    line {line}: {url} ({problem})")
+    print(f"  checked {page_count} pages, {total} broken link(s)")
+    return total
+
+
+def main():
+    sys.exit(1 if report(*check_site()) else 0)
+
+
+if __name__ == '__main__':
+    main()
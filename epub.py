@@ -0,0 +1,225 @@
+"""
+Export the book as an EPUB 3 for e-readers.
+
+Nothing is rendered again for the export: the main pages are the bodies
+build_site.py builds from the extracted source sections (without the page nav
+and footer), the reference notes are the RenderedNotes of the same build or,
+for --only epub, those build_site.py saved when it last wrote their pages
+(the vault is read only if no build has rendered them all yet), and
+the stylesheet is templates/site.css with the screen-only parts (sidebar,
+menu, page nav, hover states, media queries) dropped and its custom
+properties filled in, since e-readers rarely support var(). Each entry is
+streamed into the zip as it is produced.
+
+The export keeps the site's file layout (index.html, ch1.html, ...,
+references/<slug>.html), so links between pages work unchanged; links to
+pages the book doesn't contain become plain text.
+
+Usage:
+  python build_site.py --only epub
+"""
+
+import posixpath, re, uuid, zipfile
+from html import escape
+from html.entities import name2codepoint
+from pathlib import Path
+
+from manifest import load_manifest
+from output import open_output
+from render import normalize_dashes
+from templating import load_asset, load_template
+
+OUT = Path(__file__).parent / "aris-big-five.epub"
+
+BOOK_TITLE = "Ari's Big Five"
+BOOK_AUTHOR = "Ari"
+BOOK_URL = "https://github.com/tfvandoore/aris-big-five"
+
+CONTAINER_XML = '''<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+    <rootfiles>
+        <rootfile full-path="content.opf" media-type="application/oebps-package+xml" />
+    </rootfiles>
+</container>
+'''
+
+# Rules for site chrome that has no place in an e-book
+SCREEN_ONLY = re.compile(r'\.sidebar|\.menu-toggle|\.main-content|\.page-nav'
+                         r'|\.footer|:hover|^html\b')
+
+# The hero's light-on-dark gradient is unreadable on e-ink
+EPUB_CSS = '''
+.hero { background: none; color: inherit; padding: 0 0 1.5rem; text-align: center; }
+.hero h1, .hero .subtitle, .hero .epigraph { color: inherit; opacity: 1; }
+'''
+
+VOID_TAG = re.compile(r'<(area|br|col|embed|hr|img|input|link|meta|source|wbr)\b'
+                      r'([^>]*?)\s*/?>')
+XML_ENTITIES = {'amp', 'lt', 'gt', 'quot', 'apos'}
+LINK = re.compile(r'<a\s[^>]*?href="([^"]*)"[^>]*>(.*?)</a>', re.DOTALL)
+
+
+def stylesheet():
+    """The e-book stylesheet, derived from templates/site.css."""
+    css = re.sub(r'/\*.*?\*/', '', load_asset("site.css"), flags=re.DOTALL)
+    # Split into top-level rules, keeping @media blocks whole
+    rules, depth, start = [], 0, 0
+    for i, c in enumerate(css):
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:i + 1].strip())
+                start = i + 1
+
+    variables = {}
+    kept = []
+    for rule in rules:
+        selector = rule[:rule.index('{')].strip()
+        if selector == ':root':
+            variables = dict(re.findall(r'(--[\w-]+)\s*:\s*([^;]+);', rule))
+        elif not selector.startswith('@') and not SCREEN_ONLY.search(selector):
+            kept.append(rule)
+    css = '\n\n'.join(kept) + '\n' + EPUB_CSS
+    return re.sub(r'var\((--[\w-]+)\)', lambda m: variables[m.group(1)].strip(), css)
+
+
+def xhtml(html):
+    """Make page HTML well-formed XHTML: closed void tags, XML-safe entities."""
+    html = VOID_TAG.sub(r'<\1\2 />', html)
+    html = re.sub(r'&(?!#?\w+;)', '&amp;', html)
+
+    def entity(m):
+        name = m.group(1)
+        if name in XML_ENTITIES:
+            return m.group(0)
+        if name in name2codepoint:
+            return f'&#{name2codepoint[name]};'
+        return f'&amp;{name};'
+    return re.sub(r'&([A-Za-z]\w*);', entity, html)
+
+
+def unlink_missing(html, page, entries):
+    """Replace links to pages the book doesn't contain with their text."""
+    base = posixpath.dirname(page)
+
+    def replace(m):
+        href = m.group(1).split('#')[0]
+        if not href or ':' in href:
+            return m.group(0)
+        target = posixpath.normpath(posixpath.join(base, href))
+        return m.group(0) if target in entries else m.group(2)
+    return LINK.sub(replace, html)
+
+
+def notes_index(notes):
+    """Body of references/index.html: the book's notes grouped by chapter."""
+    manifest = load_manifest()
+    included = {note.name for note in notes}
+    parts = ['<h1>Further Reading</h1>', '<div class="ref-grid">']
+    for ch, ch_title in manifest.chapter_titles.items():
+        items = [n for n in manifest.by_chapter[ch] if n.name in included]
+        if not items:
+            continue
+        parts.append(f'<div class="ref-chapter-group">\n'
+                     f'    <div class="ref-chapter-label">Chapter {ch}: {ch_title}</div>\n'
+                     f'    <ul class="ref-list">')
+        parts += [f'        <li><a href="{n.slug}.html">{n.name}</a></li>' for n in items]
+        parts.append('    </ul>\n</div>')
+    parts.append('</div>')
+    return '\n'.join(parts)
+
+
+def note_body(note):
+    ch_title = load_manifest().chapter_titles.get(note.chapter, "")
+    return f'''<div class="back-link-bar">
+    <a href="../ch{note.chapter}.html">&larr; Chapter {note.chapter}: {ch_title}</a>
+</div>
+
+<div class="note-content">
+    <h2>{note.name}</h2>
+    {note.html}
+</div>'''
+
+
+def nav_body(pages, notes):
+    """Body of nav.xhtml: the main pages, then the notes by chapter."""
+    manifest = load_manifest()
+    lines = ['<nav epub:type="toc" id="toc">', '<h1>Contents</h1>', '<ol>']
+    lines += [f'<li><a href="{href}">{escape(title)}</a></li>'
+              for href, title, _ in pages]
+    lines += ['<li><a href="references/index.html">Source Notes</a>', '<ol>']
+    for ch, ch_title in manifest.chapter_titles.items():
+        items = [n for n in notes if n.chapter == ch]
+        if not items:
+            continue
+        lines += [f'<li><span>Chapter {ch}: {escape(ch_title)}</span>', '<ol>']
+        lines += [f'<li><a href="references/{n.slug}.html">{escape(n.name)}</a></li>'
+                  for n in items]
+        lines += ['</ol></li>']
+    lines += ['</ol></li>', '</ol>', '</nav>']
+    return '\n'.join(lines)
+
+
+def export_epub(pages, notes, modified, out=OUT, book_title=BOOK_TITLE,
+                url=BOOK_URL, author=BOOK_AUTHOR):
+    """Write the EPUB.
+
+    pages is (href, title, body) for each main page in reading order, notes
+    the RenderedNotes to include, and modified the date the book last changed
+    (YYYY-MM-DD), which also dates the zip entries so exports are repeatable.
+    The book's identifier is derived from url, so each book needs its own.
+    """
+    pages = list(pages)
+    entries = {href for href, _, _ in pages}
+    entries.add("references/index.html")
+    entries.update(f"references/{note.slug}.html" for note in notes)
+
+    date_time = tuple(map(int, modified.split('-'))) + (0, 0, 0)
+    page_template = load_template("epub_page.xhtml")
+
+    with open_output(out) as archive, \
+            zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as book:
+        def write(name, pieces, compress=zipfile.ZIP_DEFLATED):
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = compress
+            with book.open(info, 'w') as fh:
+                for piece in pieces:
+                    fh.write(piece.encode('utf-8'))
+
+        def write_page(href, title, body):
+            body = unlink_missing(xhtml(normalize_dashes(body)), href, entries)
+            write(href, page_template.iter_render({
+                'title': escape(normalize_dashes(title)),
+                'prefix': '../' * href.count('/'),
+                'body': body,
+            }))
+
+        # The mimetype entry must come first, uncompressed
+        write("mimetype", ["application/epub+zip"], zipfile.ZIP_STORED)
+        write("META-INF/container.xml", [CONTAINER_XML])
+        write("style.css", [stylesheet()])
+
+        for href, title, body in pages:
+            write_page(href, title, body)
+        write_page("references/index.html", "Further Reading", notes_index(notes))
+        for note in notes:
+            write_page(f"references/{note.slug}.html", note.name, note_body(note))
+        write_page("nav.xhtml", "Contents", nav_body(pages, notes))
+
+        spine = [(href.removesuffix('.html'), href) for href, _, _ in pages]
+        spine.append(("notes-index", "references/index.html"))
+        spine += [(f"note-{note.slug}", f"references/{note.slug}.html") for note in notes]
+        write("content.opf", load_template("epub_package.opf").iter_render({
+            'identifier': f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, url)}",
+            'title': escape(book_title, quote=False),
+            'author': escape(author, quote=False),
+            'modified': f"{modified}T00:00:00Z",
+            'items': '\n'.join(
+                f'        <item id="{id_}" href="{href}" media-type="application/xhtml+xml" />'
+                for id_, href in spine),
+            'itemrefs': '\n'.join(f'        <itemref idref="{id_}" />' for id_, _ in spine),
+        }))
+
+    print(f"  wrote {out.name} ({len(pages)} pages, {len(notes)} notes)")
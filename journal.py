@@ -0,0 +1,74 @@
+"""
+Checkpoint journal, so a build that dies partway can be resumed.
+
+As a build completes each unit of work (a page written, a note rendered) it
+appends a line to .build/journal.jsonl. A build that finishes deletes the
+journal. If one dies instead (a bad note, a killed process), the next build
+with the same arguments and inputs finds the journal, skips the units it
+lists and carries on from the first unfinished one.
+
+The first line identifies the run: {"run": key}. Each further line is
+{"unit": name, "data": ...}, where data is whatever the build needs to
+stand in for redoing the unit.
+"""
+
+import json
+from pathlib import Path
+
+JOURNAL = Path(__file__).parent / ".build" / "journal.jsonl"
+
+# Units finished by the interrupted build being resumed: {unit: data}
+RESUMED = {}
+
+_journal = None  # open journal file, or None when not journaling
+
+
+def open_journal(run_key, path=JOURNAL):
+    """Start journaling a build, resuming a previous one with the same key."""
+    global _journal
+    close_journal()
+    RESUMED.clear()
+
+    if path.exists():
+        with open(path, encoding='utf-8') as fh:
+            header = fh.readline()
+            if header.strip() and json.loads(header).get('run') == run_key:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a killed process
+                    RESUMED[entry['unit']] = entry['data']
+    if RESUMED:
+        print(f"Resuming an interrupted build: {len(RESUMED)} units already done")
+
+    # Start over from what was read, dropping any torn line
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _journal = open(path, 'w', encoding='utf-8')
+    _journal.write(json.dumps({'run': run_key}) + '\n')
+    for unit, data in RESUMED.items():
+        record(unit, data)
+    _journal.flush()
+
+
+def completed(unit):
+    """The recorded data of a unit the interrupted build finished, or None."""
+    return RESUMED.get(unit)
+
+
+def record(unit, data):
+    """Record that a unit is done; data must be JSON-serializable."""
+    if _journal is not None:
+        _journal.write(json.dumps({'unit': unit, 'data': data}) + '\n')
+        _journal.flush()
+
+
+def close_journal(finished=False, path=JOURNAL):
+    """Stop journaling; a finished build has nothing to resume, so drop it."""
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+    if finished:
+        RESUMED.clear()
+        path.unlink(missing_ok=True)
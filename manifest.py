@@ -0,0 +1,118 @@
+"""
+Note manifest shared by build_site.py, build_references.py and update_index.py.
+
+notes.json lists the book's chapters and, for each chapter, the vault notes it
+references in reading order. Its "aliases" map extra display names used in the
+text to the vault note they refer to.
+
+A build with several books (see build_site.py --books) gives each its own
+manifest; use_manifest() selects the one load_manifest() returns.
+
+Names resolve to notes case- and punctuation-insensitively, so "Ad Astra"
+finds the note "Ad astra" without an alias. Two notes (or an alias and a
+note) that resolve to the same slug or key fail the build.
+"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+MANIFEST_FILE = Path(__file__).parent / "notes.json"
+
+_current = MANIFEST_FILE  # the manifest load_manifest() reads by default
+
+
+class Chapter(NamedTuple):
+    number: int
+    title: str
+    word: str
+    sub: str
+
+
+class Note(NamedTuple):
+    name: str
+    slug: str
+    chapter: int
+
+
+@lru_cache(maxsize=None)
+def slugify(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+@lru_cache(maxsize=None)
+def name_key(name: str) -> str:
+    """Lookup key ignoring case, spacing and punctuation ("Aren't" == "arent")."""
+    return re.sub(r'[^a-z0-9]+', '', name.lower())
+
+
+class Manifest:
+    """Chapters and notes from notes.json, indexed by name and slug."""
+
+    def __init__(self, data):
+        self.chapters = [
+            Chapter(ch['number'], ch['title'], ch['word'], ch['sub'])
+            for ch in data['chapters']
+        ]
+        self.chapter_titles = {ch.number: ch.title for ch in self.chapters}
+
+        self.notes = []
+        self.by_name = {}
+        self.by_slug = {}
+        self.by_key = {}
+        self.by_chapter = {ch.number: [] for ch in self.chapters}
+        for ch in data['chapters']:
+            for name in ch['notes']:
+                note = Note(name, slugify(name), ch['number'])
+                if note.slug in self.by_slug:
+                    raise ValueError(f"Slug collision: {name!r} and "
+                                     f"{self.by_slug[note.slug].name!r} are both "
+                                     f"'{note.slug}'")
+                self.notes.append(note)
+                self.by_name[name] = note
+                self.by_slug[note.slug] = note
+                self._add_key(name, note)
+                self.by_chapter[note.chapter].append(note)
+
+        # Display name -> note, for names that differ from the vault filename
+        for alias, name in data.get('aliases', {}).items():
+            self._add_key(alias, self.by_name[name])
+
+    def _add_key(self, name, note):
+        key = name_key(name)
+        other = self.by_key.get(key)
+        if other and other != note:
+            raise ValueError(f"Name collision: {name!r} could mean "
+                             f"{other.name!r} or {note.name!r}")
+        self.by_key[key] = note
+
+    @property
+    def names(self):
+        return [note.name for note in self.notes]
+
+    def resolve(self, name):
+        """The note a display name, alias or wikilink target refers to, or None."""
+        return self.by_key.get(name_key(name))
+
+    def slug_for(self, name):
+        """Slug of the note a name refers to, or its plain slug if none does."""
+        note = self.by_key.get(name_key(name))
+        return note.slug if note else slugify(name)
+
+
+def use_manifest(path):
+    """Make path the manifest load_manifest() returns by default."""
+    global _current
+    _current = Path(path)
+
+
+def load_manifest(path=None):
+    """Load and index notes.json (or the manifest in use), once per process."""
+    return _load(Path(path) if path else _current)
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    return Manifest(json.loads(path.read_text(encoding='utf-8')))
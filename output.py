@@ -0,0 +1,129 @@
+"""
+Where build outputs go: to disk, or into memory for a dry run.
+
+Every file the build publishes is written through open_output() or
+write_output(). During a dry run (build_site.py --dry-run) they are kept in
+memory instead, and report_dry_run() compares them with the files on disk.
+Build state under .build/ (caches, history) is left alone in a dry run; its
+writers check dry_running() first.
+
+Observers (see OBSERVERS) see each output's bytes as they are written, e.g.
+to validate pages without reading them back (validate_html.py).
+"""
+
+import hashlib, io
+from contextlib import contextmanager
+
+# Outputs of the current dry run, {path: bytes}, or None when writing to
+# disk. A value of None marks an output the build found already up to date.
+DRY_RUN = None
+
+# Called as observer(path) when an output is opened. Returns None to ignore
+# it, or a function called with each chunk of bytes written, then with None
+# when the output is closed.
+OBSERVERS = []
+
+
+def dry_running():
+    return DRY_RUN is not None
+
+
+def set_dry_run(enabled):
+    """Start (or cancel) a dry run."""
+    global DRY_RUN
+    DRY_RUN = {} if enabled else None
+
+
+class _Tee:
+    """A write-only file that also passes what is written to observers."""
+
+    def __init__(self, fh, sinks):
+        self.fh, self.sinks = fh, sinks
+
+    def write(self, data):
+        for sink in self.sinks:
+            sink(bytes(data))
+        return self.fh.write(data)
+
+
+@contextmanager
+def _observed(fh, path):
+    sinks = [sink for sink in (observer(path) for observer in OBSERVERS) if sink]
+    if not sinks:
+        yield fh
+        return
+    yield _Tee(fh, sinks)
+    for sink in sinks:
+        sink(None)
+
+
+@contextmanager
+def open_output(path):
+    """Open an output file for writing bytes (a buffer in a dry run)."""
+    if DRY_RUN is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as fh, _observed(fh, path) as out:
+            yield out
+    else:
+        buffer = io.BytesIO()
+        with _observed(buffer, path) as out:
+            yield out
+        DRY_RUN[path] = buffer.getvalue()
+
+
+def write_output(path, data):
+    with open_output(path) as fh:
+        fh.write(data)
+
+
+def keep_output(path):
+    """Note that an output already on disk is up to date and was not rewritten."""
+    if DRY_RUN is not None:
+        DRY_RUN.setdefault(path, None)
+
+
+def file_hash(path):
+    with open(path, 'rb') as fh:
+        return hashlib.file_digest(fh, 'sha256').digest()
+
+
+def report_dry_run(root, owned=(), diff=False):
+    """Print how the dry run's outputs differ from disk, and end the dry run.
+
+    owned is every file on disk a complete build would produce; those the
+    dry run didn't produce are reported as orphaned. With diff, changed text
+    files are shown as unified diffs. Returns True if anything differs.
+    """
+    global DRY_RUN
+    outputs, DRY_RUN = DRY_RUN, None
+
+    status = {'added': [], 'changed': [], 'unchanged': [], 'orphaned': []}
+    for path, data in sorted(outputs.items()):
+        if data is None:
+            status['unchanged'].append(path)
+        elif not path.exists():
+            status['added'].append(path)
+        elif file_hash(path) != hashlib.sha256(data).digest():
+            status['changed'].append(path)
+        else:
+            status['unchanged'].append(path)
+    status['orphaned'] = sorted(set(owned) - set(outputs))
+
+    for kind in ('added', 'changed', 'orphaned'):
+        for path in status[kind]:
+            print(f"  {kind:<8} {path.relative_to(root).as_posix()}")
+    print("  " + ", ".join(f"{len(paths)} {kind}" for kind, paths in status.items()))
+
+    if diff:
+        import difflib
+
+        for path in status['changed']:
+            rel = path.relative_to(root).as_posix()
+            try:
+                old = path.read_text(encoding='utf-8').splitlines(keepends=True)
+                new = outputs[path].decode('utf-8').splitlines(keepends=True)
+            except UnicodeDecodeError:
+                print(f"Binary files a/{rel} and b/{rel} differ")
+                continue
+            print(''.join(difflib.unified_diff(old, new, f"a/{rel}", f"b/{rel}")), end='')
+    return any(status[kind] for kind in ('added', 'changed', 'orphaned'))
@@ -0,0 +1,128 @@
+"""
+Page weight report: how big each built page is, and where the bytes go.
+
+For every page a build writes, records the raw, minified and gzipped sizes
+and how many bytes are inlined <style> and <script> rather than content.
+Each build appends the pages it measured (and those gone since) to
+.build/page-weight.jsonl, so growth can be followed build over build, and
+keeps the whole site's latest measurements in .build/page-weight.latest.json
+(pages not rebuilt keep their last measurement), so a build reads one small
+file however long the history grows. Pages or a site over budget are reported; build_site.py
+--strict-budget fails the build instead.
+"""
+
+import gzip, json, re, time
+from pathlib import Path
+from typing import NamedTuple
+
+ROOT = Path(__file__).parent
+HISTORY = ROOT / ".build" / "page-weight.jsonl"
+LATEST_SUFFIX = ".latest.json"  # next to the history: page-weight.latest.json
+
+# Budgets in raw bytes. references.html, the largest page, is ~312 KB.
+PAGE_BUDGET = 350_000
+SITE_BUDGET = 2_500_000
+
+# Pages whose size changed by at least this fraction are listed
+REPORT_CHANGE = 0.05
+
+STYLE = re.compile(rb'<style[^>]*>.*?</style>', re.DOTALL)
+SCRIPT = re.compile(rb'<script[^>]*>.*?</script>', re.DOTALL)
+
+
+class PageWeight(NamedTuple):
+    raw: int
+    minified: int
+    gzipped: int
+    css: int  # inlined <style> blocks, tags included
+    js: int   # inlined <script> blocks, tags included
+
+
+def minify(data):
+    """Roughly what an HTML minifier would leave: no comments, no runs of space."""
+    data = re.sub(rb'<!--.*?-->', b'', data, flags=re.DOTALL)
+    data = re.sub(rb'>\s+<', b'><', data)
+    return re.sub(rb'\s{2,}', b' ', data)
+
+
+def measure(data):
+    return PageWeight(
+        raw=len(data),
+        minified=len(minify(data)),
+        gzipped=len(gzip.compress(data, compresslevel=6, mtime=0)),
+        css=sum(len(m) for m in STYLE.findall(data)),
+        js=sum(len(m) for m in SCRIPT.findall(data)),
+    )
+
+
+def latest_path(history=HISTORY):
+    return history.with_suffix(LATEST_SUFFIX)
+
+
+def last_snapshot(history=HISTORY):
+    """{page: PageWeight} of the whole site as last measured, or {} if never."""
+    latest = latest_path(history)
+    if latest.exists():
+        pages = json.loads(latest.read_text(encoding='utf-8'))
+    elif history.exists():
+        # Rebuild it from the history, as written before the latest was kept
+        pages = {}
+        with open(history, encoding='utf-8') as fh:
+            for line in fh:
+                entry = json.loads(line)
+                pages.update(entry['pages'])
+                for page in entry.get('removed', ()):
+                    pages.pop(page, None)
+    else:
+        return {}
+    return {page: PageWeight(*w) for page, w in pages.items()}
+
+
+def kb(n):
+    return f"{n / 1000:.1f} KB"
+
+
+def record_build(pages, root=ROOT, history=HISTORY):
+    """Measure the pages written this build, record them and report the site.
+
+    pages are paths relative to root. Returns the budget overruns found, as
+    messages.
+    """
+    previous = last_snapshot(history)
+    snapshot = {page: w for page, w in previous.items() if (root / page).exists()}
+    measured = {page: measure((root / page).read_bytes()) for page in pages}
+    snapshot.update(measured)
+    snapshot = dict(sorted(snapshot.items()))
+
+    history.parent.mkdir(parents=True, exist_ok=True)
+    entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+             'pages': {page: list(w) for page, w in sorted(measured.items())}}
+    if removed := sorted(previous.keys() - snapshot.keys()):
+        entry['removed'] = removed
+    with open(history, 'a', encoding='utf-8') as fh:
+        fh.write(json.dumps(entry) + '\n')
+    latest = latest_path(history)
+    latest.write_text(json.dumps({page: list(w) for page, w in snapshot.items()}) + '\n',
+                      encoding='utf-8')
+
+    total = PageWeight(*(sum(w[i] for w in snapshot.values())
+                         for i in range(len(PageWeight._fields))))
+    if total.raw:
+        print(f"  site: {kb(total.raw)} raw, {kb(total.minified)} minified, "
+              f"{kb(total.gzipped)} gzipped; inlined CSS {total.css / total.raw:.0%}, "
+              f"JS {total.js / total.raw:.0%}, content "
+              f"{1 - (total.css + total.js) / total.raw:.0%}")
+
+    for page in pages:
+        old, new = previous.get(page), snapshot[page]
+        if old and old.raw and abs(new.raw - old.raw) >= REPORT_CHANGE * old.raw:
+            print(f"  {page}: {kb(old.raw)} -> {kb(new.raw)} "
+                  f"({(new.raw - old.raw) / old.raw:+.0%})")
+
+    over = [f"{page} is {kb(w.raw)} (budget {kb(PAGE_BUDGET)})"
+            for page, w in snapshot.items() if w.raw > PAGE_BUDGET]
+    if total.raw > SITE_BUDGET:
+        over.append(f"the site is {kb(total.raw)} (budget {kb(SITE_BUDGET)})")
+    for message in over:
+        print(f"  WARNING: {message}")
+    return over
@@ -0,0 +1,181 @@
+"""
+Render vault notes once for every output that shows them.
+
+render_note() turns a note into cleaned HTML once per note content: markdown,
+wikilinks resolved against the manifest, version notes, "See also" and
+duplicate headings removed. build_site.py puts that HTML on the note's
+references/<slug>.html page; build_references.py rewrites its ref links to
+in-page anchors for the single-page references.html, and epub.py packages it
+into the e-book. Each of those applies normalize_dashes() to it when writing;
+the HTML kept here is as markdown left it.
+
+Books built together (see build_site.py --books) share the markdown pass;
+only resolving links against each book's manifest is done per book.
+"""
+
+import hashlib, re
+from functools import lru_cache
+from typing import NamedTuple
+
+from manifest import load_manifest
+from vault import READ_AHEAD, read_ahead
+
+
+class RenderedNote(NamedTuple):
+    name: str
+    slug: str
+    chapter: int
+    html: str  # ref links point at sibling pages: <a href="<slug>.html" class="ref">
+
+
+def strip_version_notes(content):
+    content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
+    content = re.sub(r'^up::.*$', '', content, flags=re.MULTILINE)
+    content = content.lstrip('\n')
+    content = re.sub(r'\n{3,}', '\n\n', content)
+    return content.strip()
+
+
+def remove_see_also(html):
+    """Remove 'See also:' paragraphs."""
+    return re.sub(r'<p>See also:.*?</p>', '', html, flags=re.DOTALL)
+
+
+def fix_poem_line_breaks(html):
+    """Convert soft newlines inside <p> blocks to <br> for poem formatting.
+
+    Targets paragraphs where every line ends with a rhyming/poetic pattern
+    (lines within a single <p> separated only by newlines). This handles the
+    Good Timber poem and any similar poetry in reference notes.
+    """
+    def add_breaks(m):
+        content = m.group(1)
+        # Only apply to blocks with 4+ lines (likely a poem stanza)
+        lines = content.strip().split('\n')
+        if len(lines) >= 4:
+            return '<p>' + '<br>\n'.join(lines) + '</p>'
+        return m.group(0)
+    return re.sub(r'<p>((?:[^\n<]+\n){3,}[^\n<]+)</p>', add_breaks, html)
+
+
+def remove_context_and_duplicate_heading(html, note_name):
+    """Remove <context>...</context> paragraphs and duplicate h1 heading."""
+    # Remove <p>&lt;context&gt;...&lt;/context&gt;</p>
+    html = re.sub(r'<p>&lt;context&gt;.*?&lt;/context&gt;</p>\s*', '', html, flags=re.DOTALL)
+    # Remove the first <h1> - it always duplicates the note title which is
+    # already shown as the page <h2>. We remove any first <h1> since the
+    # template provides the title. Handles case/punctuation/apostrophe variants.
+    html = re.sub(r'<h1>[^<]+</h1>\s*', '', html, count=1)
+    return html
+
+
+def convert_wikilinks_to_ref_links(html):
+    """Convert [[wikilinks]] to reference page links."""
+    manifest = load_manifest()
+
+    def replace_wl(m):
+        name = m.group(1)
+        slug = manifest.slug_for(name)
+        return f'<a href="{slug}.html" class="ref">{name}</a>'
+    return re.sub(r'\[\[([^\]]+)\]\]', replace_wl, html)
+
+
+def remove_broken_ref_links(html):
+    """Replace ref links to non-existent pages with plain text spans."""
+    valid_slugs = load_manifest().by_slug
+
+    def replace_if_broken(m):
+        href = m.group(1)
+        text = m.group(2)
+        slug = href.replace('.html', '')
+        if slug in valid_slugs:
+            return m.group(0)  # keep valid links
+        return text  # replace with plain text (no tag at all)
+    return re.sub(r'<a href="([^"]+\.html)" class="ref">([^<]+)</a>', replace_if_broken, html)
+
+
+def fix_ref_links_from_subdir(html):
+    """For pages inside references/, convert references.html#slug to slug.html."""
+    return re.sub(
+        r'href="references\.html#([^"]+)"',
+        r'href="\1.html"',
+        html
+    )
+
+
+def normalize_dashes(html):
+    """Replace em-dashes and double hyphens with single hyphens in content.
+
+    Preserves CSS custom properties (--var-name) and HTML comments.
+    Tim uses single hyphens consistently.
+    """
+    # Replace &mdash; entity
+    html = html.replace('&mdash;', '-')
+    # Replace literal em-dash character
+    html = html.replace('\u2014', '-')
+    # Replace en-dash character
+    html = html.replace('\u2013', '-')
+    # Replace double hyphens in content, but NOT in CSS (-- as custom properties)
+    # or HTML comments. We do this by splitting on <style> blocks and only
+    # replacing in non-style content.
+    parts = re.split(r'(<style>.*?</style>|<!--.*?-->)', html, flags=re.DOTALL)
+    for i, part in enumerate(parts):
+        if not part.startswith('<style>') and not part.startswith('<!--'):
+            # Replace " -- " with " - " (spaced double-hyphen)
+            parts[i] = part.replace(' -- ', ' - ')
+            # Replace remaining double-hyphens not in CSS context
+            parts[i] = re.sub(r'(?<!-)--(?![->\w])', '-', parts[i])
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def markdown():
+    """The shared mistune renderer, created on first use."""
+    import mistune
+    return mistune.create_markdown()
+
+
+# Markdown of each note text, keyed by its hash. It doesn't depend on the
+# manifest, so every book showing a note shares it.
+MARKDOWN_CACHE = {}
+
+# Rendered note HTML keyed by (manifest, name, hash of the raw note), so a
+# long-running build (see build_daemon.py) only re-renders notes that changed
+NOTE_CACHE = {}
+
+
+def render_note(note, raw):
+    """Render a manifest note's raw markdown."""
+    digest = hashlib.sha256(raw.encode('utf-8')).digest()
+    key = (load_manifest(), note.name, digest)
+    if key not in NOTE_CACHE:
+        if digest not in MARKDOWN_CACHE:
+            MARKDOWN_CACHE[digest] = markdown()(strip_version_notes(raw))
+        html_content = convert_wikilinks_to_ref_links(MARKDOWN_CACHE[digest])
+        html_content = remove_broken_ref_links(html_content)
+        html_content = remove_see_also(html_content)
+        html_content = remove_context_and_duplicate_heading(html_content, note.name)
+        html_content = fix_poem_line_breaks(html_content)
+        NOTE_CACHE[key] = fix_ref_links_from_subdir(html_content)
+    return RenderedNote(*note, NOTE_CACHE[key])
+
+
+def render_notes(vault, notes, max_in_flight=READ_AHEAD):
+    """Yield a RenderedNote for each note found in the vault, in order."""
+    texts = read_ahead(vault, [note.name for note in notes], max_in_flight)
+    for note, raw in zip(notes, texts):
+        if raw is None:
+            print(f"  WARNING: {note.name}.md not found, skipping")
+            continue
+        yield render_note(note, raw)
+
+
+def anchor_ref_links(html):
+    """Point ref links at #slug anchors instead of sibling <slug>.html pages."""
+    valid_slugs = load_manifest().by_slug
+
+    def replace(m):
+        if m.group(1) in valid_slugs:
+            return f'href="#{m.group(1)}"'
+        return m.group(0)
+    return re.sub(r'href="([^"/:#]+)\.html"', replace, html)
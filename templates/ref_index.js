@@ -0,0 +1,63 @@
+// Virtualized note lists for references/index.html (see build_site.py).
+// Each <ul class="ref-virtual"> is sized for all its notes but only holds
+// the rows in or near view; their names come from JSON chunks
+// (data-src + chunk number + ".json", data-chunk notes each), fetched as
+// they are first needed.
+(function () {
+    const ROW = 30;      // px per row, as in the .ref-virtual li rule
+    const OVERSCAN = 10; // rows rendered beyond each edge of the viewport
+    const lists = Array.from(document.querySelectorAll('.ref-virtual'), ul => ({
+        ul,
+        count: +ul.dataset.count,
+        size: +ul.dataset.chunk,
+        src: ul.dataset.src,
+        chunks: {},  // chunk number -> [[name, slug], ...], or null while loading
+        shown: '',
+    }));
+
+    function load(list, n) {
+        if (n in list.chunks) return;
+        list.chunks[n] = null;
+        fetch(`${list.src}${n}.json`)
+            .then(response => response.json())
+            .then(rows => { list.chunks[n] = rows; schedule(); })
+            .catch(() => { delete list.chunks[n]; });
+    }
+
+    function render(list) {
+        const top = list.ul.getBoundingClientRect().top;
+        const first = Math.max(0, Math.floor(-top / ROW) - OVERSCAN);
+        const last = Math.min(list.count, Math.ceil((innerHeight - top) / ROW) + OVERSCAN);
+        const rows = [];
+        for (let i = first; i < last; i++) {
+            const chunk = list.chunks[Math.floor(i / list.size)];
+            if (chunk === undefined) load(list, Math.floor(i / list.size));
+            if (chunk) rows.push(i);
+        }
+        const key = rows.join(',');
+        if (key === list.shown) return;
+        list.shown = key;
+        list.ul.replaceChildren(...rows.map(i => {
+            const [name, slug] = list.chunks[Math.floor(i / list.size)][i % list.size];
+            const li = document.createElement('li');
+            const a = document.createElement('a');
+            li.style.top = `${i * ROW}px`;
+            a.href = `${slug}.html`;
+            a.textContent = name;
+            li.append(a);
+            return li;
+        }));
+    }
+
+    let pending = false;
+    function schedule() {
+        if (pending) return;
+        pending = true;
+        requestAnimationFrame(() => { pending = false; lists.forEach(render); });
+    }
+
+    for (const list of lists) list.ul.style.height = `${list.count * ROW}px`;
+    addEventListener('scroll', schedule, {passive: true});
+    addEventListener('resize', schedule);
+    schedule();
+})();
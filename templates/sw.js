@@ -0,0 +1,42 @@
+// Generated by build_site.py - do not edit.
+// Manifest version: {{version}}
+const CACHE = 'aris-big-five';
+const MANIFEST = 'precache-manifest.json';
+
+// Every URL to precache: the pages, and data files such as index chunks.
+const entries = manifest => ({...manifest.pages, ...manifest.data});
+
+// Only fetch files whose hash changed since the manifest we cached last time.
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE);
+        const fresh = await (await fetch(MANIFEST, {cache: 'no-store'})).json();
+        const cached = await cache.match(MANIFEST);
+        const previous = cached ? entries(await cached.json()) : {};
+        const current = entries(fresh);
+        const changed = Object.keys(current)
+            .filter(url => previous[url] !== current[url]);
+        await cache.addAll(changed.map(url => new Request(url, {cache: 'reload'})));
+        for (const url of Object.keys(previous)) {
+            if (!(url in current)) await cache.delete(url);
+        }
+        await cache.put(MANIFEST, new Response(JSON.stringify(fresh)));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(self.clients.claim());
+});
+
+// Cache first, network as fallback.
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== location.origin) return;
+    if (url.pathname.endsWith('/')) url.pathname += 'index.html';
+    event.respondWith((async () => {
+        const cache = await caches.open(CACHE);
+        const hit = await cache.match(url.href, {ignoreSearch: true});
+        return hit || fetch(event.request);
+    })());
+});
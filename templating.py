@@ -0,0 +1,77 @@
+"""
+Minimal precompiled templates for the build scripts.
+
+Templates use {{name}} placeholders, so the CSS and JS inside them need no
+brace escaping. Each template is compiled once into literal segments and
+placeholder names, and can be rendered to a string or piece by piece, for
+the caller to encode and write as it goes. Placeholder values may be strings
+or iterables of strings, which are streamed without being joined first.
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class Template:
+    """A template compiled into alternating literals and placeholder names."""
+
+    def __init__(self, source=None, literals=None, names=None):
+        if source is not None:
+            parts = PLACEHOLDER.split(source)
+            literals, names = parts[0::2], parts[1::2]
+        self.literals = tuple(literals)
+        self.names = tuple(names)
+
+    def iter_render(self, context):
+        """Yield the rendered template piece by piece."""
+        yield self.literals[0]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = context[name]
+            if isinstance(value, str):
+                yield value
+            elif isinstance(value, int):
+                yield str(value)
+            else:
+                yield from value
+            yield literal
+
+    def render(self, **context):
+        return ''.join(self.iter_render(context))
+
+    def partial(self, **context):
+        """Fill in some placeholders, returning a template of the rest."""
+        literals, names = [self.literals[0]], []
+        for name, literal in zip(self.names, self.literals[1:]):
+            if name in context:
+                value = context[name]
+                literals[-1] += value if isinstance(value, str) else ''.join(value)
+                literals[-1] += literal
+            else:
+                names.append(name)
+                literals.append(literal)
+        return Template(literals=literals, names=names)
+
+
+def joined(sep, items):
+    """Stream items with sep between them, like sep.join(items) unjoined."""
+    for i, item in enumerate(items):
+        if i:
+            yield sep
+        yield item
+
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    """Compile templates/<name>, once per process."""
+    return Template((TEMPLATE_DIR / name).read_text(encoding='utf-8'))
+
+
+@lru_cache(maxsize=None)
+def load_asset(name):
+    """Read templates/<name> verbatim (stylesheets, scripts), once per process."""
+    return (TEMPLATE_DIR / name).read_text(encoding='utf-8')
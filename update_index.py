@@ -1,47 +1,25 @@
 """
 Update index.html: convert ref spans to links and add Further Reading section.
+
+Rewrites the file in one streaming pass, line by line into a temporary file
+that then replaces it. Every edit first checks for its own marker, so running
+this again on an already-updated file changes nothing.
 """
 
-import re
+import os, re
 from pathlib import Path
 
-INDEX = Path(__file__).parent / "index.html"
-
-# Map display names to their slugs in references.html
-# Some vault filenames differ from display names (e.g. "Ad astra" vs "Ad Astra")
-SLUG_OVERRIDES = {
-    "Ad Astra": "ad-astra",
-    "Kids aren't a barrier to our happiness. They are a doorway.": "kids-aren-t-a-barrier-to-our-happiness-they-are-a-doorway",
-}
-
-
-def slugify(name: str) -> str:
-    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
-
-
-def get_slug(name: str) -> str:
-    return SLUG_OVERRIDES.get(name, slugify(name))
+from manifest import load_manifest
 
+INDEX = Path(__file__).parent / "index.html"
 
-def update():
-    html = INDEX.read_text(encoding='utf-8')
-
-    # Convert <span class="ref">Name</span> to <a href="references.html#slug" class="ref">Name</a>
-    def replace_ref(m):
-        name = m.group(1)
-        slug = get_slug(name)
-        return f'<a href="references.html#{slug}" class="ref">{name}</a>'
+REF_SPAN = re.compile(r'<span class="ref">([^<]+)</span>')
 
-    html = re.sub(r'<span class="ref">([^<]+)</span>', replace_ref, html)
+REF_RULE = '.ref {'
+REF_RULE_EXTRA = '\n            text-decoration: none;\n            transition: background 0.2s;'
 
-    # Add .ref a styles if not present
-    if 'a.ref' not in html and '.ref:hover' not in html:
-        html = html.replace(
-            '.ref {',
-            '.ref {\n            text-decoration: none;\n            transition: background 0.2s;'
-        )
-        # Add hover state
-        style_insert = '''
+# Add hover state
+REF_STYLES = '''
 
         .ref:hover {
             background: #e5dfd3;
@@ -51,28 +29,73 @@ def update():
             text-decoration: none;
         }
 '''
-        html = html.replace('/* --- Blockquotes ---', style_insert + '/* --- Blockquotes ---')
+BLOCKQUOTES = '/* --- Blockquotes ---'
 
-    # Add Further Reading section before the footer
-    further_reading = '''
-<!-- ============ FURTHER READING ============ -->
+FURTHER_READING_MARKER = '<!-- ============ FURTHER READING ============ -->'
+FOOTER_MARKER = '<!-- ============ FOOTER ============ -->'
+FURTHER_READING = f'''
+{FURTHER_READING_MARKER}
 <section class="conclusion" id="further-reading">
     <h2>Further Reading</h2>
-    <p>The chapters above draw on 43 source notes from the Nexus vault. Each contains Tim's original thinking, enriched with research and cross-references. They are the raw material from which this thesis was composed.</p>
+    <p>The chapters above draw on {{count}} source notes from the Nexus vault. Each contains Tim's original thinking, enriched with research and cross-references. They are the raw material from which this thesis was composed.</p>
     <p style="text-align: center; margin: 2rem 0;"><a href="references.html" style="font-family: 'Helvetica Neue', Arial, sans-serif; background: #2c5f2d; color: #fff; padding: 0.75em 2em; border-radius: 6px; text-decoration: none; font-size: 0.95rem; display: inline-block;">Read the source notes &rarr;</a></p>
 </section>
 
-<!-- ============ FOOTER ============ -->'''
+{FOOTER_MARKER}'''
 
-    html = html.replace('<!-- ============ FOOTER ============ -->', further_reading)
+TOC_CONCLUSION = '<li><a href="#conclusion">Conclusion: The Diamond</a></li>'
+TOC_FURTHER_READING = '\n        <li><a href="#further-reading">Further Reading</a> <span class="toc-sub">\u2014 {count} source notes from the vault</span></li>'
 
-    # Also add Further Reading to the TOC
-    html = html.replace(
-        '<li><a href="#conclusion">Conclusion: The Diamond</a></li>',
-        '<li><a href="#conclusion">Conclusion: The Diamond</a></li>\n        <li><a href="#further-reading">Further Reading</a> <span class="toc-sub">\u2014 43 source notes from the vault</span></li>'
-    )
 
-    INDEX.write_text(html, encoding='utf-8')
+def rewrite(lines):
+    """Yield the updated document for an iterable of its lines."""
+    manifest = load_manifest()
+    further_reading = FURTHER_READING.format(count=len(manifest.notes))
+    toc_further_reading = TOC_FURTHER_READING.format(count=len(manifest.notes))
+
+    # Convert <span class="ref">Name</span> to <a href="references.html#slug" class="ref">Name</a>
+    def replace_ref(m):
+        name = m.group(1)
+        slug = manifest.slug_for(name)
+        return f'<a href="references.html#{slug}" class="ref">{name}</a>'
+
+    seen_ref_styles = False
+    seen_further_reading = False
+    lines = iter(lines)
+    line = next(lines, None)
+    while line is not None:
+        # One line of lookahead, to see whether an insertion is already there
+        following = next(lines, None) or ''
+
+        seen_ref_styles |= 'a.ref' in line or '.ref:hover' in line
+        seen_further_reading |= FURTHER_READING_MARKER in line
+
+        line = REF_SPAN.sub(replace_ref, line)
+
+        # Add .ref a styles if not present
+        if (REF_RULE in line and not seen_ref_styles
+                and 'text-decoration: none;' not in following):
+            line = line.replace(REF_RULE, REF_RULE + REF_RULE_EXTRA)
+        if BLOCKQUOTES in line and not seen_ref_styles:
+            line = line.replace(BLOCKQUOTES, REF_STYLES + BLOCKQUOTES)
+        # Add Further Reading section before the footer
+        if FOOTER_MARKER in line and not seen_further_reading:
+            line = line.replace(FOOTER_MARKER, further_reading)
+        # Also add Further Reading to the TOC
+        if TOC_CONCLUSION in line and 'href="#further-reading"' not in following:
+            line = line.replace(TOC_CONCLUSION, TOC_CONCLUSION + toc_further_reading)
+
+        yield line
+
+        line = following or None
+
+
+def update():
+    tmp = INDEX.with_suffix('.html.tmp')
+    with open(INDEX, encoding='utf-8', newline='') as src, \
+            open(tmp, 'w', encoding='utf-8', newline='') as out:
+        out.writelines(rewrite(src))
+    os.replace(tmp, INDEX)
     print("Updated index.html with links and Further Reading section")
 
 
@@ -0,0 +1,146 @@
+"""
+Check that the HTML the build writes is well-formed, as it is written.
+
+The build's pages come out of regex surgery on the source HTML (article
+wrappers stripped, the conclusion's reference section cut, links
+rewritten), which can leave a tag unbalanced without anything else
+noticing. A Validator watches every .html output (see output.OBSERVERS):
+the chunks of each page are passed to a worker thread as they are written
+and fed to an incremental html.parser tokenizer there, so checking keeps
+pace with the writes instead of rereading the site afterwards.
+
+Reported per page with line numbers: end tags with no open element, and
+elements never closed. Elements whose end tag HTML lets you omit (p, li,
+td, ...) are closed implicitly, as a browser would.
+
+Usage:
+  python validate_html.py [PAGE ...]   # default: every page; exits 1 on errors
+"""
+
+import codecs, sys, threading
+from html.parser import HTMLParser
+from pathlib import Path
+from queue import SimpleQueue
+
+ROOT = Path(__file__).parent
+
+VOID = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+        'meta', 'source', 'track', 'wbr'}
+OPTIONAL_END = {'p', 'li', 'dt', 'dd', 'rt', 'rp', 'optgroup', 'option',
+                'thead', 'tbody', 'tfoot', 'tr', 'td', 'th', 'colgroup',
+                'html', 'head', 'body'}
+
+
+class PageChecker(HTMLParser):
+    """Tokenize one page incrementally, tracking the open elements."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.open = []    # (tag, line) of each open element
+        self.errors = []  # (line, message)
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID:
+            self.open.append((tag, self.getpos()[0]))
+
+    def handle_endtag(self, tag):
+        line = self.getpos()[0]
+        if tag in VOID:
+            return
+        for i in range(len(self.open) - 1, -1, -1):
+            if self.open[i][0] == tag:
+                break
+        else:
+            self.errors.append((line, f"</{tag}> closes nothing"))
+            return
+        for inner, opened in self.open[i + 1:]:
+            if inner not in OPTIONAL_END:
+                self.errors.append(
+                    (line, f"</{tag}> closes <{inner}> from line {opened}"))
+        del self.open[i:]
+
+    def close(self):
+        super().close()
+        for tag, opened in self.open:
+            if tag not in OPTIONAL_END:
+                self.errors.append((opened, f"<{tag}> is never closed"))
+        self.open.clear()
+        return self.errors
+
+
+def check(data):
+    """[(line, message), ...] for a whole page's text."""
+    checker = PageChecker()
+    checker.feed(data)
+    return checker.close()
+
+
+_DONE = object()
+
+
+class Validator:
+    """Validate each .html output on a worker thread as it is written.
+
+    Register it in output.OBSERVERS for the build, then call finish() for
+    {page: [(line, message), ...]}, pages relative to root.
+    """
+
+    def __init__(self, root=ROOT):
+        self.root = root
+        self.pages = 0
+        self.errors = {}
+        self.queue = SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __call__(self, path):
+        if path.suffix != '.html':
+            return None
+        self.queue.put(path.relative_to(self.root).as_posix())
+        return self.queue.put
+
+    def run(self):
+        page = checker = decoder = None
+        while (item := self.queue.get()) is not _DONE:
+            if isinstance(item, str):    # a page is being opened
+                page, checker = item, PageChecker()
+                decoder = codecs.getincrementaldecoder('utf-8')('replace')
+            elif item is not None:       # a chunk of it
+                checker.feed(decoder.decode(item))
+            else:                        # it was closed
+                checker.feed(decoder.decode(b'', final=True))
+                if errors := checker.close():
+                    self.errors[page] = errors
+                self.pages += 1
+
+    def finish(self):
+        self.queue.put(_DONE)
+        self.thread.join()
+        return self.errors
+
+
+def report(errors, page_count):
+    """Print malformed markup per page; return how many problems there are."""
+    total = sum(len(problems) for problems in errors.values())
+    for page, problems in sorted(errors.items()):
+        print(f"  {page}:")
+        for line, message in problems:
+            print(f"    line {line}: {message}")
+    print(f"  validated {page_count} pages, {total} problem(s)")
+    return total
+
+
+def main(argv=None):
+    import check_links
+
+    pages = argv if argv is not None else sys.argv[1:]
+    pages = pages or check_links.site_pages()
+    errors = {}
+    for page in pages:
+        if problems := check((ROOT / page).read_text(encoding='utf-8')):
+            errors[page] = problems
+    sys.exit(1 if report(errors, len(pages)) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Read vault notes from the vault folder or from a packed snapshot of it.
+
+A snapshot (vault.pack) holds every note listed in notes.json in one file, so
+the site can be built anywhere the vault folder isn't available, e.g. CI.
+
+Usage:
+  python vault.py pack [--vault DIR] [--out vault.pack]
+
+Pack format (all integers little-endian):
+  b"ABFPACK1"
+  u32 note count
+  per note, sorted by name: u16 name length, UTF-8 name, u64 offset, u32 length
+  note bodies (UTF-8), at the offsets given, relative to the start of the file
+"""
+
+import mmap, struct
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+from manifest import load_manifest
+
+ROOT = Path(__file__).parent
+VAULT_DIR = Path(r"C:\Users\Tim\Documents\Ari\Aris place\Aris big five")
+VAULT_PACK = ROOT / "vault.pack"
+
+PACK_MAGIC = b"ABFPACK1"
+
+# Notes read concurrently ahead of the one being rendered. Synced or network
+# vault folders have high per-file latency, so overlapping reads pays off.
+READ_AHEAD = 8
+
+
+class VaultDir:
+    """Notes read straight from the vault folder."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def read(self, name):
+        """Return the note's text, or None if there is no such note."""
+        path = self.path / f"{name}.md"
+        if not path.is_file():
+            return None
+        return path.read_text(encoding='utf-8')
+
+
+class VaultPack:
+    """Notes read from a memory-mapped vault.pack through its offset table."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if self._view[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{self.path} is not a vault pack")
+
+        self.index = {}
+        pos = len(PACK_MAGIC)
+        (count,) = struct.unpack_from('<I', self._map, pos)
+        pos += 4
+        for _ in range(count):
+            (name_len,) = struct.unpack_from('<H', self._map, pos)
+            pos += 2
+            name = str(self._view[pos:pos + name_len], 'utf-8')
+            pos += name_len
+            self.index[name] = struct.unpack_from('<QI', self._map, pos)
+            pos += 12
+
+    def read(self, name):
+        """Return the note's text, or None if the pack doesn't hold it."""
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        # Decodes straight out of the mapping, without an intermediate bytes copy
+        return str(self._view[offset:offset + length], 'utf-8')
+
+
+def open_vault(path=None):
+    """Open a vault folder or pack; by default the vault if present, else the pack."""
+    if path is None:
+        if not VAULT_DIR.is_dir() and not VAULT_PACK.exists():
+            raise SystemExit(f"No vault found: neither the vault folder {VAULT_DIR} "
+                             f"nor {VAULT_PACK} exists. Pass --vault, or create the "
+                             f"pack on a machine with the vault: python vault.py pack")
+        path = VAULT_DIR if VAULT_DIR.is_dir() else VAULT_PACK
+    path = Path(path)
+    if path.is_dir():
+        return VaultDir(path)
+    if not path.exists():
+        raise SystemExit(f"No vault folder or pack at {path}")
+    return VaultPack(path)
+
+
+@lru_cache(maxsize=None)
+def reader_pool(max_workers):
+    """The thread pool of this size, shared by every read_ahead() in the process."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='vault-read')
+
+
+def read_ahead(vault, names, max_in_flight=READ_AHEAD):
+    """Yield each note's text (or None) in order, reading ahead on a thread pool.
+
+    At most max_in_flight reads are outstanding at once. Packs are already in
+    memory, so they (and max_in_flight < 1) are read in turn instead.
+    """
+    if max_in_flight < 1 or not isinstance(vault, VaultDir):
+        for name in names:
+            yield vault.read(name)
+        return
+
+    names = iter(names)
+    pool = reader_pool(max_in_flight)
+    pending = deque(pool.submit(vault.read, name)
+                    for _, name in zip(range(max_in_flight), names))
+    try:
+        while pending:
+            text = pending.popleft().result()
+            name = next(names, None)
+            if name is not None:
+                pending.append(pool.submit(vault.read, name))
+            yield text
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def changed_notes(vault, rev):
+    """Names of manifest notes added, changed or deleted in the vault since rev.
+
+    Asks git rather than hashing or stat-ing every note, so the vault folder
+    must be (inside) a git repository. Uncommitted and untracked notes count
+    as changed.
+    """
+    if not isinstance(vault, VaultDir):
+        raise SystemExit("--since needs a vault folder, not a pack")
+    import subprocess
+
+    def git(*args):
+        result = subprocess.run(['git', '-C', str(vault.path), *args],
+                                capture_output=True, text=True, encoding='utf-8')
+        if result.returncode != 0:
+            raise SystemExit(f"git {args[0]} failed: {result.stderr.strip()}")
+        # -z: paths come NUL-separated and unquoted, as they are on disk
+        return result.stdout.split('\0')[:-1]
+
+    paths = git('diff', '-z', '--name-only', '--relative', rev, '--', '*.md')
+    paths += git('ls-files', '-z', '--others', '--exclude-standard', '--', '*.md')
+    # Notes live at the top of the vault folder
+    stems = {Path(p).stem for p in paths if '/' not in p}
+    manifest = load_manifest()
+    return {name for name in manifest.names if name in stems}
+
+
+def pack_vault(vault_dir=VAULT_DIR, out=VAULT_PACK):
+    """Pack every note in the manifest from vault_dir into out."""
+    source = VaultDir(vault_dir)
+    notes = []
+    for name in sorted(load_manifest().names):
+        text = source.read(name)
+        if text is None:
+            print(f"  WARNING: {name}.md not found, skipping")
+            continue
+        notes.append((name.encode('utf-8'), text.encode('utf-8')))
+
+    header_size = len(PACK_MAGIC) + 4 + sum(2 + len(name) + 12 for name, _ in notes)
+    header = [PACK_MAGIC, struct.pack('<I', len(notes))]
+    offset = header_size
+    for name, body in notes:
+        header += [struct.pack('<H', len(name)), name,
+                   struct.pack('<QI', offset, len(body))]
+        offset += len(body)
+
+    with open(out, 'wb') as fh:
+        fh.writelines(header)
+        fh.writelines(body for _, body in notes)
+    print(f"Packed {len(notes)} notes into {Path(out).name} ({offset:,} bytes)")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    pack = sub.add_parser('pack', help="Pack the manifest's notes into vault.pack")
+    pack.add_argument('--vault', type=Path, default=VAULT_DIR)
+    pack.add_argument('--out', type=Path, default=VAULT_PACK)
+    args = parser.parse_args()
+    if args.command == 'pack':
+        pack_vault(args.vault, args.out)
+
+
+if __name__ == '__main__':
+    main()